@@ -0,0 +1,29 @@
+-- =====================================================
+-- Migration 013: Findings Severity Bucket
+--
+-- Purpose: Store the score-based dashboard severity bucket once per
+-- finding instead of re-deriving it from the score on every request.
+--
+-- Changes:
+-- 1. Add generated column findings.severity_bucket (high/medium/low by score)
+-- 2. Index the bucket for dashboard filtering
+-- IDEMPOTENT: Safe to run multiple times
+-- =====================================================
+
+ALTER TABLE findings
+    ADD COLUMN IF NOT EXISTS severity_bucket TEXT
+    GENERATED ALWAYS AS (
+        CASE
+            WHEN score > 50 THEN 'high'
+            WHEN score > 25 THEN 'medium'
+            ELSE 'low'
+        END
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_findings_severity_bucket
+    ON findings(severity_bucket);
+
+COMMENT ON COLUMN findings.severity_bucket IS
+    'Score-based severity bucket (>50 high, >25 medium, else low) used by dashboard group views';
+
+ANALYZE findings;
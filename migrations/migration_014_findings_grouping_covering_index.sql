@@ -0,0 +1,29 @@
+-- =====================================================
+-- Migration 014: Covering Index for Findings Aggregation
+--
+-- Purpose: Stop materialized view refreshes from re-reading every
+-- historical findings heap page (including the wide JSONB metadata).
+--
+-- mv_grouped_findings aggregates MAX/AVG(score) and COUNT(DISTINCT report_id)
+-- per (tool_type, category, name) and probes the same key for its
+-- in_latest_report check. With score and report_id included in the index,
+-- both can be answered with index-only scans.
+--
+-- Changes:
+-- 1. Add covering index on findings(tool_type, category, name) INCLUDE (report_id, score)
+-- 2. Drop idx_findings_grouping, which the covering index supersedes
+-- IDEMPOTENT: Safe to run multiple times
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_findings_grouping_covering
+    ON findings(tool_type, category, name)
+    INCLUDE (report_id, score);
+
+DROP INDEX IF EXISTS idx_findings_grouping;
+
+COMMENT ON INDEX idx_findings_grouping_covering IS
+    'Covering index for grouped findings aggregation - enables index-only scans during view refresh';
+
+-- Update statistics for the query planner (VACUUM cannot run inside the
+-- migration transaction; autovacuum maintains the visibility map)
+ANALYZE findings;
@@ -7,7 +7,7 @@ from uuid import uuid4
 
 import aiofiles
 import uvicorn
-from fastapi import FastAPI, Depends, UploadFile, File, HTTPException, Request
+from fastapi import FastAPI, Depends, UploadFile, File, HTTPException, Query, Request
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
@@ -25,6 +25,7 @@ from server.parser import PingCastleParser
 from server.alerter import Alerter
 from server.routers import settings as settings_router
 from server.routers import upload as upload_router
+from server.upload_service import request_view_refresh
 from server.database import init_database, engine
 from server.migration_runner import run_migrations_on_startup, get_migration_status
 from server.health_check import get_database_health, get_quick_health
@@ -122,6 +123,9 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 # Max upload size (bytes)
 MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", 10 * 1024 * 1024))  # 10 MB
 
+# Largest page the fast domain groups endpoint will return
+MAX_DOMAIN_GROUPS_LIMIT = 1000
+
 # Include routers
 app.include_router(settings_router.router)
 app.include_router(upload_router.router)
@@ -262,21 +266,17 @@ async def _process_single_file(file: UploadFile, storage: PostgresReportStorage)
                     logging.warning(f"Failed to update risk scores after upload: {e}")
                     # Don't fail the upload if risk calculation fails
 
-        # Alert on unaccepted findings
-        unaccepted = storage.get_unaccepted_findings(report.findings)
-        if unaccepted:
-            settings = storage.get_settings()
-            from server.alerter import Alerter
-            alerter = Alerter(storage)
-            alerter.send_alert(settings, report, unaccepted)
+        # Alert on unaccepted findings (only worth computing when a webhook is set)
+        settings = storage.get_settings()
+        if settings.webhook_url:
+            unaccepted = storage.get_unaccepted_findings(report.findings)
+            if unaccepted:
+                from server.alerter import Alerter
+                alerter = Alerter(storage)
+                alerter.send_alert(settings, report, unaccepted)
         
-        # Refresh materialized views for fast dashboard loading
-        try:
-            storage.refresh_materialized_views()
-            logging.info("Refreshed materialized views after report upload")
-        except Exception as mv_error:
-            logging.warning(f"Materialized view refresh failed (non-critical): {mv_error}")
-            # Don't fail the upload if refresh fails
+        # Refresh materialized views for fast dashboard loading (debounced, in background)
+        request_view_refresh()
         
         return UploadResponse(
             status="success",
@@ -1549,6 +1549,9 @@ def get_grouped_findings_summary_fast(
 @app.get("/api/domain_groups/{domain}/fast")
 def get_domain_groups_fast(
     domain: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_DOMAIN_GROUPS_LIMIT),
+    after_score: Optional[int] = None,
+    after_group: Optional[str] = None,
     storage: PostgresReportStorage = Depends(get_storage)
 ):
     """
@@ -1559,11 +1562,21 @@ def get_domain_groups_fast(
     Path parameters:
     - domain: Domain to get groups for
     
+    Query parameters:
+    - limit: Optional maximum number of groups to return (1 to MAX_DOMAIN_GROUPS_LIMIT)
+    - after_score / after_group: Keyset cursor from the last group of the
+      previous page (groups are ordered by risk score, then name, descending)
+    
     Returns:
         List of groups with member counts and acceptance status
     """
     try:
-        groups = storage.get_domain_groups_fast(domain)
+        groups = storage.get_domain_groups_fast(
+            domain,
+            limit=limit,
+            after_score=after_score,
+            after_group=after_group
+        )
         return groups
     except Exception as e:
         logging.exception(f"Failed to get domain groups for {domain}")
@@ -23,6 +23,9 @@ from sqlalchemy.exc import SQLAlchemyError
 
 logger = logging.getLogger(__name__)
 
+# Pattern: migration_XXX_description.sql
+_MIGRATION_FILENAME_RE = re.compile(r'^migration_(\d+)_(.+)\.sql$')
+
 
 @dataclass
 class Migration:
@@ -47,7 +50,7 @@ class Migration:
             )
         
         # Match migration_XXX_description.sql pattern
-        match = re.match(r'^migration_(\d+)_(.+)\.sql$', filename)
+        match = _MIGRATION_FILENAME_RE.match(filename)
         if match:
             return cls(
                 filename=filename,
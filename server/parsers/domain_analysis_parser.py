@@ -3,10 +3,36 @@ from server.parsers.base_parser import BaseSecurityParser
 from uuid import uuid4
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
+import codecs
 import json
 import logging
 
+try:
+    import orjson
+except ImportError:  # Fall back to stdlib json if orjson is not installed
+    orjson = None
+
+# Built-in groups whose membership drives the group risk score and severity
+_HIGH_RISK_GROUPS = frozenset({'Domain Admins', 'Enterprise Admins', 'Schema Admins'})
+_MEDIUM_RISK_GROUPS = frozenset({'Administrators', 'Account Operators', 'Backup Operators'})
+
+# can_parse() sniffs this many leading bytes before falling back to a full decode
+_SNIFF_BYTES = 256
+
+
+def _loads(raw: bytes) -> Any:
+    """Decode a JSON document, dropping the UTF-8 BOM PowerShell writes."""
+    if raw.startswith(codecs.BOM_UTF8):
+        raw = raw[len(codecs.BOM_UTF8):]
+    try:
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"Domain analysis report is not valid JSON (truncated or corrupt file?): {e}") from e
+
+
 class DomainAnalysisParser(BaseSecurityParser):
     """Parser for domain analysis reports (JSON format)."""
     
@@ -24,9 +50,22 @@ class DomainAnalysisParser(BaseSecurityParser):
             return False
         
         try:
-            # Use utf-8-sig to handle UTF-8 BOM from PowerShell
-            with open(file_path, 'r', encoding='utf-8-sig') as f:
-                data = json.load(f)
+            with open(file_path, 'rb') as f:
+                head = f.read(_SNIFF_BYTES)
+                
+                # Every supported format is a JSON object
+                if not head.lstrip(codecs.BOM_UTF8 + b' \t\r\n').startswith(b'{'):
+                    return False
+                
+                # The PowerShell scanner writes tool_type, domain and groups first, so
+                # its reports can be routed without decoding the whole file; a file
+                # that turns out truncated is rejected with a clear error by parse
+                if (b'"tool_type"' in head and b'"domain_group_members"' in head and
+                    b'"domain"' in head and b'"groups"' in head):
+                    logging.debug(f"DomainAnalysisParser: Matched domain_group_members header for {file_path}")
+                    return True
+                
+                data = _loads(head + f.read())
             
             # Check for domain analysis specific structure
             # Support both raw format and DonWatcher report format
@@ -56,10 +95,17 @@ class DomainAnalysisParser(BaseSecurityParser):
     
     def parse_report(self, file_path: Path) -> Report:
         """Parse domain analysis JSON file."""
-        # Use utf-8-sig to handle UTF-8 BOM from PowerShell
-        with open(file_path, 'r', encoding='utf-8-sig') as f:
-            data = json.load(f)
+        with open(file_path, 'rb') as f:
+            data = _loads(f.read())
         
+        return self._parse_data(data, file_path)
+    
+    def parse_bytes(self, data: bytes) -> Report:
+        """Parse a domain analysis JSON document that is already in memory."""
+        return self._parse_data(_loads(data))
+    
+    def _parse_data(self, data: Dict[str, Any], file_path: Optional[Path] = None) -> Report:
+        """Dispatch decoded JSON to the parser for its format."""
         # Check for new domain_group_members format (from PowerShell scanner)
         if data.get('tool_type') == 'domain_group_members':
             return self._parse_domain_group_members_format(data, file_path)
@@ -69,7 +115,7 @@ class DomainAnalysisParser(BaseSecurityParser):
             return self._parse_donwatcher_format(data)
         
         # Otherwise parse as raw domain analysis format
-        return self._parse_raw_format(data)
+        return self._parse_raw_format(data, file_path)
     
     def _parse_donwatcher_format(self, data: Dict[str, Any]) -> Report:
         """Parse data that's already in DonWatcher report format."""
@@ -100,7 +146,7 @@ class DomainAnalysisParser(BaseSecurityParser):
         
         return Report(**report_data)
     
-    def _parse_raw_format(self, data: Dict[str, Any]) -> Report:
+    def _parse_raw_format(self, data: Dict[str, Any], file_path: Optional[Path] = None) -> Report:
         """Parse raw domain analysis data format."""
         # Extract basic information
         domain = data.get('domain', data.get('domain_info', {}).get('name', 'Unknown'))
@@ -180,10 +226,10 @@ class DomainAnalysisParser(BaseSecurityParser):
             upload_date=datetime.utcnow(),
             metadata=data.get('metadata', {}),
             findings=findings,
-            original_file=str(file_path)
+            original_file=str(file_path) if file_path else None
         )
     
-    def _parse_domain_group_members_format(self, data: Dict[str, Any], file_path: Path) -> Report:
+    def _parse_domain_group_members_format(self, data: Dict[str, Any], file_path: Optional[Path] = None) -> Report:
         """Parse new domain_group_members format from PowerShell scanner."""
         from server.models import Report, Finding
         
@@ -207,7 +253,9 @@ class DomainAnalysisParser(BaseSecurityParser):
         findings = []
         
         # Process groups from the new format
-        groups_data = data.get('groups', {})
+        groups_data = data.get('groups')
+        if not isinstance(groups_data, dict):
+            raise ValueError("domain_group_members report is missing its 'groups' object")
         for group_name, members in groups_data.items():
             if not isinstance(members, list):
                 continue
@@ -286,18 +334,15 @@ class DomainAnalysisParser(BaseSecurityParser):
                 'data_scope': 'group_memberships_only'  # Clear scope indication
             },
             findings=findings,
-            original_file=str(file_path)
+            original_file=str(file_path) if file_path else None
         )
     
     def _calculate_group_risk_score(self, group_name: str, member_count: int) -> int:
         """Calculate risk score based on group type and member count."""
-        high_risk_groups = ['Domain Admins', 'Enterprise Admins', 'Schema Admins']
-        medium_risk_groups = ['Administrators', 'Account Operators', 'Backup Operators']
-        
         base_score = 0
-        if group_name in high_risk_groups:
+        if group_name in _HIGH_RISK_GROUPS:
             base_score = 15
-        elif group_name in medium_risk_groups:
+        elif group_name in _MEDIUM_RISK_GROUPS:
             base_score = 10
         else:
             base_score = 5
@@ -314,21 +359,21 @@ class DomainAnalysisParser(BaseSecurityParser):
     
     def _determine_group_severity(self, group_name: str, member_count: int) -> str:
         """Determine severity based on group type and member count."""
-        high_risk_groups = ['Domain Admins', 'Enterprise Admins', 'Schema Admins']
-        
-        if group_name in high_risk_groups and member_count > 5:
+        if group_name in _HIGH_RISK_GROUPS and member_count > 5:
             return "high"
-        elif group_name in high_risk_groups or member_count > 10:
+        elif group_name in _HIGH_RISK_GROUPS or member_count > 10:
             return "medium"
         else:
             return "low"
     
     def extract_group_memberships(self, report: Report, storage=None) -> List[GroupMembership]:
         """Extract group membership data from the report."""
+        return list(self.iter_group_memberships(report, storage))
+    
+    def iter_group_memberships(self, report: Report, storage=None) -> Iterator[GroupMembership]:
+        """Yield group memberships from the report one at a time."""
         if not storage:
-            return []  # Can't process without storage access
-            
-        memberships = []
+            return  # Can't process without storage access
         
         for finding in report.findings:
             # Accept both legacy and normalized categories
@@ -392,6 +437,4 @@ class DomainAnalysisParser(BaseSecurityParser):
                         )
                         # Note: is_enabled will be handled by the enhanced GroupMembership model
                         # after database migration is applied
-                        memberships.append(membership)
-        
-        return memberships
+                        yield membership
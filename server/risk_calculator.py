@@ -7,9 +7,14 @@ scores without interfering with existing risk assessments.
 """
 
 import logging
+import operator
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+from dataclasses import dataclass, field
+from functools import lru_cache
 from enum import Enum
 
 from server.models import SecurityToolType, Finding, Report
@@ -31,7 +36,18 @@ class GroupRiskLevel(str, Enum):
     LOW = "low"            # Print Operators, custom groups
 
 
-@dataclass
+# Integer rank per risk level, so hot paths compare ints instead of enum members
+_RISK_LEVEL_RANK = {
+    GroupRiskLevel.LOW: 0,
+    GroupRiskLevel.MEDIUM: 1,
+    GroupRiskLevel.HIGH: 2,
+    GroupRiskLevel.CRITICAL: 3,
+}
+_HIGH_RANK = _RISK_LEVEL_RANK[GroupRiskLevel.HIGH]
+_CRITICAL_RANK = _RISK_LEVEL_RANK[GroupRiskLevel.CRITICAL]
+
+
+@dataclass(slots=True, frozen=True)
 class GroupRiskProfile:
     """Risk profile configuration for different group types"""
     name: str
@@ -39,9 +55,13 @@ class GroupRiskProfile:
     base_weight: float
     max_acceptable_members: int
     escalation_multiplier: float
+    rank: int = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'rank', _RISK_LEVEL_RANK[self.risk_level])
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DomainGroupRisk:
     """Individual group risk assessment"""
     group_name: str
@@ -50,10 +70,14 @@ class DomainGroupRisk:
     unaccepted_members: int
     risk_score: float
     risk_level: GroupRiskLevel
-    contributing_factors: Dict[str, float]
+    contributing_factors: Mapping[str, float]
+    rank: int = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'rank', _RISK_LEVEL_RANK[self.risk_level])
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DomainRiskAssessment:
     """Complete domain risk assessment"""
     domain: str
@@ -75,7 +99,7 @@ class DomainRiskAssessment:
     calculation_metadata: Dict[str, any]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class GlobalRiskScore:
     """Combined global risk assessment"""
     domain: str
@@ -99,6 +123,16 @@ class GlobalRiskScore:
     trend_percentage: float = 0.0
 
 
+# Global risk combination weights as (pingcastle, domain_group, hoxhunt), keyed on
+# (has_pingcastle, has_hoxhunt). Hoxhunt contributes inversely (awareness -> risk).
+_GLOBAL_RISK_WEIGHTS: Dict[Tuple[bool, bool], Tuple[float, float, float]] = {
+    (True, True): (0.55, 0.30, 0.15),    # All three data sources available
+    (True, False): (0.70, 0.30, 0.0),    # PingCastle + Domain Groups only (original behavior)
+    (False, True): (0.0, 0.65, 0.35),    # Domain Groups + Hoxhunt only
+    (False, False): (0.0, 1.0, 0.0),     # Only Domain Groups available
+}
+
+
 class RiskCalculator:
     """Main risk calculation engine"""
     
@@ -177,69 +211,32 @@ class RiskCalculator:
             accepted_member_details: Optional details about accepted members
             
         Returns:
-            DomainGroupRisk object with calculated risk assessment
+            DomainGroupRisk object with calculated risk assessment. Results are
+            memoized on (group_name, total_members, accepted_members) and shared
+            between callers, so contributing_factors is a read-only mapping.
         """
-        unaccepted_members = total_members - accepted_members
-        
-        # Get group profile or create default
-        profile = self.GROUP_PROFILES.get(group_name, GroupRiskProfile(
-            name=group_name,
-            risk_level=GroupRiskLevel.LOW,
-            base_weight=1.0,
-            max_acceptable_members=10,
-            escalation_multiplier=1.0
-        ))
-        
-        # Calculate base risk from unaccepted members
-        if total_members == 0:
-            base_risk = 0.0
-        else:
-            unaccepted_ratio = unaccepted_members / total_members
-            base_risk = min(unaccepted_ratio * 100, 100)
-        
-        # Risk factors
-        contributing_factors = {}
-        
-        # Factor 1: Unaccepted member ratio
-        contributing_factors['unaccepted_ratio'] = base_risk
-        
-        # Factor 2: Absolute number of unaccepted members
-        if unaccepted_members > profile.max_acceptable_members:
-            excess_members = unaccepted_members - profile.max_acceptable_members
-            excess_risk = min(excess_members * 10, 50)  # Cap at 50 points
-            contributing_factors['excess_members'] = excess_risk
-        else:
-            contributing_factors['excess_members'] = 0.0
-        
-        # Factor 3: Group criticality multiplier
-        criticality_multiplier = profile.escalation_multiplier
-        contributing_factors['criticality_multiplier'] = criticality_multiplier
-        
-        # Factor 4: Zero acceptance penalty for critical groups
-        if (profile.risk_level == GroupRiskLevel.CRITICAL and 
-            accepted_members == 0 and total_members > 0):
-            contributing_factors['zero_acceptance_penalty'] = 25.0
-        else:
-            contributing_factors['zero_acceptance_penalty'] = 0.0
-        
-        # Calculate final risk score
-        raw_risk = (
-            contributing_factors['unaccepted_ratio'] + 
-            contributing_factors['excess_members'] +
-            contributing_factors['zero_acceptance_penalty']
-        ) * criticality_multiplier
-        
-        final_risk = min(raw_risk, 100.0)
+        return _score_group(group_name, total_members, accepted_members)
+    
+    def calculate_group_risks_batch(self, group_data: List[Dict]) -> List[DomainGroupRisk]:
+        """
+        Calculate risk scores for a batch of groups in one pass
         
-        return DomainGroupRisk(
-            group_name=group_name,
-            total_members=total_members,
-            accepted_members=accepted_members,
-            unaccepted_members=unaccepted_members,
-            risk_score=final_risk,
-            risk_level=profile.risk_level,
-            contributing_factors=contributing_factors
-        )
+        Args:
+            group_data: List of group dictionaries with group_name, total_members
+                        and accepted_members
+            
+        Returns:
+            List of DomainGroupRisk objects, in the same order as group_data
+        """
+        calculate = self.calculate_group_risk
+        return [
+            calculate(
+                group_name=group_info.get('group_name', ''),
+                total_members=group_info.get('total_members', 0),
+                accepted_members=group_info.get('accepted_members', 0)
+            )
+            for group_info in group_data
+        ]
     
     def calculate_domain_risk(self, domain: str, group_data: List[Dict], 
                             storage=None) -> DomainRiskAssessment:
@@ -255,20 +252,43 @@ class RiskCalculator:
             DomainRiskAssessment with complete domain risk analysis
         """
         assessment_date = datetime.utcnow()
-        group_risks = []
+        
+        (group_risks, access_governance, privilege_escalation, compliance_posture,
+         operational_risk, domain_group_score, summary) = self._score_domain_groups(group_data)
+        
+        return DomainRiskAssessment(
+            domain=domain,
+            assessment_date=assessment_date,
+            access_governance_score=access_governance,
+            privilege_escalation_score=privilege_escalation,
+            compliance_posture_score=compliance_posture,
+            operational_risk_score=operational_risk,
+            domain_group_score=domain_group_score,
+            group_risks=list(group_risks),
+            calculation_metadata={
+                **summary,
+                'calculation_timestamp': assessment_date.isoformat()
+            }
+        )
+    
+    def _score_domain_groups(self, group_data: List[Dict]) -> tuple:
+        """
+        Score a domain's groups, memoized on the (group_name, total_members,
+        accepted_members) of each group so unchanged data is only scored once.
+        The cache is module-level, so it is shared by every RiskCalculator.
+        """
+        key = tuple(
+            (g.get('group_name', ''), g.get('total_members', 0), g.get('accepted_members', 0))
+            for g in group_data
+        )
+        with _domain_risk_cache_lock:
+            cached = _domain_risk_cache.get(key)
+            if cached is not None:
+                _domain_risk_cache.move_to_end(key)
+                return cached
         
         # Calculate individual group risks
-        for group_info in group_data:
-            group_name = group_info.get('group_name', '')
-            total_members = group_info.get('total_members', 0)
-            accepted_members = group_info.get('accepted_members', 0)
-            
-            group_risk = self.calculate_group_risk(
-                group_name=group_name,
-                total_members=total_members,
-                accepted_members=accepted_members
-            )
-            group_risks.append(group_risk)
+        group_risks = tuple(self.calculate_group_risks_batch(group_data))
         
         # Calculate category scores
         access_governance = self._calculate_access_governance_score(group_risks)
@@ -284,30 +304,28 @@ class RiskCalculator:
             operational_risk * 0.1
         )
         
-        return DomainRiskAssessment(
-            domain=domain,
-            assessment_date=assessment_date,
-            access_governance_score=access_governance,
-            privilege_escalation_score=privilege_escalation,
-            compliance_posture_score=compliance_posture,
-            operational_risk_score=operational_risk,
-            domain_group_score=domain_group_score,
-            group_risks=group_risks,
-            calculation_metadata={
-                'calculation_method': 'weighted_group_aggregation',
-                'group_count': len(group_risks),
-                'critical_groups': len([g for g in group_risks if g.risk_level == GroupRiskLevel.CRITICAL]),
-                'high_risk_groups': len([g for g in group_risks if g.risk_score > 50]),
-                'total_members': sum(g.total_members for g in group_risks),
-                'total_unaccepted': sum(g.unaccepted_members for g in group_risks),
-                'calculation_timestamp': assessment_date.isoformat()
-            }
-        )
+        summary = {
+            'calculation_method': 'weighted_group_aggregation',
+            'group_count': len(group_risks),
+            'critical_groups': sum(1 for g in group_risks if g.rank == _CRITICAL_RANK),
+            'high_risk_groups': len([g for g in group_risks if g.risk_score > 50]),
+            'total_members': sum(g.total_members for g in group_risks),
+            'total_unaccepted': sum(g.unaccepted_members for g in group_risks)
+        }
+        
+        result = (group_risks, access_governance, privilege_escalation, compliance_posture,
+                  operational_risk, domain_group_score, summary)
+        with _domain_risk_cache_lock:
+            _domain_risk_cache[key] = result
+            if len(_domain_risk_cache) > _DOMAIN_RISK_CACHE_SIZE:
+                _domain_risk_cache.popitem(last=False)
+        return result
     
     def calculate_global_risk(self, domain: str, pingcastle_score: Optional[float],
                             domain_group_score: float,
                             historical_scores: List[Tuple[datetime, float]] = None,
-                            hoxhunt_score: Optional[float] = None) -> GlobalRiskScore:
+                            hoxhunt_score: Optional[float] = None,
+                            assessment_date: Optional[datetime] = None) -> GlobalRiskScore:
         """
         Calculate combined global risk score from PingCastle, Domain Group, and Hoxhunt scores
 
@@ -318,17 +336,13 @@ class RiskCalculator:
             historical_scores: Optional historical global scores for trend analysis
             hoxhunt_score: Hoxhunt security awareness score (0-100, higher = better)
                           Note: This is converted to risk contribution internally
+            assessment_date: Optional assessment timestamp, defaults to now (UTC)
 
         Returns:
             GlobalRiskScore with combined assessment
         """
-        assessment_date = datetime.utcnow()
-
-        # Base risk combination weights
-        # These are adjusted dynamically based on data availability
-        BASE_PINGCASTLE_WEIGHT = 0.55  # Infrastructure and configuration security
-        BASE_DOMAIN_GROUP_WEIGHT = 0.30  # Access governance and privilege management
-        BASE_HOXHUNT_WEIGHT = 0.15  # User security awareness (contributes inversely)
+        if assessment_date is None:
+            assessment_date = datetime.utcnow()
 
         # Convert Hoxhunt awareness score to risk contribution
         # Higher awareness = lower risk, so we invert it
@@ -338,35 +352,15 @@ class RiskCalculator:
         has_pingcastle = pingcastle_score is not None
         has_hoxhunt = hoxhunt_risk is not None
         
-        # Calculate weights based on available data
-        if has_pingcastle and has_hoxhunt:
-            # All three data sources available
-            pingcastle_weight = BASE_PINGCASTLE_WEIGHT
-            domain_group_weight = BASE_DOMAIN_GROUP_WEIGHT
-            hoxhunt_weight = BASE_HOXHUNT_WEIGHT
-        elif has_pingcastle and not has_hoxhunt:
-            # PingCastle + Domain Groups only (original behavior)
-            pingcastle_weight = 0.70
-            domain_group_weight = 0.30
-            hoxhunt_weight = 0.0
-        elif not has_pingcastle and has_hoxhunt:
-            # Domain Groups + Hoxhunt only
-            pingcastle_weight = 0.0
-            domain_group_weight = 0.65
-            hoxhunt_weight = 0.35
-        else:
-            # Only Domain Groups available
-            pingcastle_weight = 0.0
-            domain_group_weight = 1.0
-            hoxhunt_weight = 0.0
+        # Pick weights based on available data; missing sources carry zero weight
+        pingcastle_weight, domain_group_weight, hoxhunt_weight = _GLOBAL_RISK_WEIGHTS[has_pingcastle, has_hoxhunt]
         
         # Calculate global score
-        global_score = 0.0
-        if has_pingcastle:
-            global_score += pingcastle_score * pingcastle_weight
-        global_score += domain_group_score * domain_group_weight
-        if has_hoxhunt:
-            global_score += hoxhunt_risk * hoxhunt_weight
+        global_score = (
+            (pingcastle_score if has_pingcastle else 0.0) * pingcastle_weight +
+            domain_group_score * domain_group_weight +
+            (hoxhunt_risk if has_hoxhunt else 0.0) * hoxhunt_weight
+        )
         
         # Calculate contribution percentages
         if global_score > 0:
@@ -411,61 +405,81 @@ class RiskCalculator:
             trend_percentage=round(trend_percentage, 2)
         )
     
+    def calculate_global_risk_batch(self, rows: List[Tuple[str, Optional[float], float, Optional[float]]]
+                                    ) -> List[GlobalRiskScore]:
+        """
+        Calculate global risk scores for many domains at once (e.g. to rank domains on a dashboard)
+        
+        Args:
+            rows: (domain, pingcastle_score, domain_group_score, hoxhunt_score) per domain,
+                  with None for unavailable PingCastle/Hoxhunt scores
+            
+        Returns:
+            List of GlobalRiskScore objects, in the same order as rows, sharing one
+            assessment date. No trend is computed since batch rows carry no history.
+        """
+        assessment_date = datetime.utcnow()
+        calculate = self.calculate_global_risk
+        return [
+            calculate(domain, pingcastle_score, domain_group_score,
+                      hoxhunt_score=hoxhunt_score, assessment_date=assessment_date)
+            for domain, pingcastle_score, domain_group_score, hoxhunt_score in rows
+        ]
+    
     def _calculate_access_governance_score(self, group_risks: List[DomainGroupRisk]) -> float:
         """Calculate access governance risk score (0-100)"""
         if not group_risks:
             return 0.0
         
-        # Weighted average based on group importance
-        total_weighted_risk = 0.0
-        total_weight = 0.0
+        # Weighted average based on group importance, focusing on acceptance rates
+        weights = [_PROFILE_LUT.get(g.group_name, _DEFAULT_PROFILE_TUPLE)[0] for g in group_risks]
+        governance_risks = [
+            g.unaccepted_members / g.total_members * 100 if g.total_members > 0 else 0.0
+            for g in group_risks
+        ]
         
-        for group_risk in group_risks:
-            profile = self.GROUP_PROFILES.get(group_risk.group_name)
-            weight = profile.base_weight if profile else 1.0
-            
-            # Focus on acceptance rates
-            if group_risk.total_members > 0:
-                unaccepted_ratio = group_risk.unaccepted_members / group_risk.total_members
-                governance_risk = unaccepted_ratio * 100
-            else:
-                governance_risk = 0.0
-            
-            total_weighted_risk += governance_risk * weight
-            total_weight += weight
+        total_weight = sum(weights)
+        total_weighted_risk = sum(map(operator.mul, governance_risks, weights))
         
         return min(total_weighted_risk / total_weight if total_weight > 0 else 0, 100.0)
     
     def _calculate_privilege_escalation_score(self, group_risks: List[DomainGroupRisk]) -> float:
         """Calculate privilege escalation risk score (0-100)"""
-        # Focus on critical and high-privilege groups
-        critical_risks = [g for g in group_risks if g.risk_level in [GroupRiskLevel.CRITICAL, GroupRiskLevel.HIGH]]
+        # Focus on critical and high-privilege groups, with a higher penalty
+        # for unaccepted members in critical groups
+        total_risk = 0.0
+        privileged_count = 0
+        for group_risk in group_risks:
+            rank = group_risk.rank
+            if rank == _CRITICAL_RANK:
+                total_risk += group_risk.risk_score * 1.5
+            elif rank == _HIGH_RANK:
+                total_risk += group_risk.risk_score
+            else:
+                continue
+            privileged_count += 1
         
-        if not critical_risks:
+        if not privileged_count:
             return 0.0
         
-        # Higher penalty for unaccepted members in privileged groups
-        total_risk = 0.0
-        for group_risk in critical_risks:
-            escalation_risk = group_risk.risk_score
-            
-            # Additional penalty for critical groups
-            if group_risk.risk_level == GroupRiskLevel.CRITICAL:
-                escalation_risk *= 1.5
-            
-            total_risk += escalation_risk
-        
         # Average and cap at 100
-        return min(total_risk / len(critical_risks), 100.0)
+        return min(total_risk / privileged_count, 100.0)
     
     def _calculate_compliance_posture_score(self, group_risks: List[DomainGroupRisk]) -> float:
         """Calculate compliance posture risk score (0-100)"""
         if not group_risks:
             return 0.0
         
-        # Overall acceptance rate across all groups
-        total_members = sum(g.total_members for g in group_risks)
-        total_unaccepted = sum(g.unaccepted_members for g in group_risks)
+        # Overall acceptance rate across all groups, counting groups with
+        # zero acceptance in the same pass
+        total_members = 0
+        total_unaccepted = 0
+        zero_acceptance_groups = 0
+        for g in group_risks:
+            total_members += g.total_members
+            total_unaccepted += g.unaccepted_members
+            if g.accepted_members == 0 and g.total_members > 0:
+                zero_acceptance_groups += 1
         
         if total_members == 0:
             return 0.0
@@ -475,7 +489,6 @@ class RiskCalculator:
         compliance_risk = unaccepted_ratio * 100
         
         # Penalty for groups with zero acceptance
-        zero_acceptance_groups = len([g for g in group_risks if g.accepted_members == 0 and g.total_members > 0])
         if zero_acceptance_groups > 0:
             compliance_risk += zero_acceptance_groups * 10  # 10 points per unmanaged group
         
@@ -486,33 +499,114 @@ class RiskCalculator:
         if not group_risks:
             return 0.0
         
-        # Risk from operational inefficiency and management gaps
-        operational_factors = []
-        
-        # Factor 1: Number of groups with mixed acceptance status
-        mixed_groups = len([g for g in group_risks if 0 < g.accepted_members < g.total_members])
-        mixed_ratio = mixed_groups / len(group_risks) if group_risks else 0
-        operational_factors.append(mixed_ratio * 50)  # Up to 50 points
-        
-        # Factor 2: Groups with excessive members
+        # Risk from operational inefficiency and management gaps, tallied in one pass:
+        # groups with mixed acceptance status, groups with excessive members and
+        # unmanaged groups (no accepted members)
+        mixed_groups = 0
         oversized_groups = 0
+        unmanaged_groups = 0
         for group_risk in group_risks:
+            if 0 < group_risk.accepted_members < group_risk.total_members:
+                mixed_groups += 1
             profile = self.GROUP_PROFILES.get(group_risk.group_name)
             if profile and group_risk.total_members > (profile.max_acceptable_members * 2):
                 oversized_groups += 1
+            if group_risk.accepted_members == 0 and group_risk.total_members > 0:
+                unmanaged_groups += 1
         
-        if group_risks:
-            oversized_ratio = oversized_groups / len(group_risks)
-            operational_factors.append(oversized_ratio * 30)  # Up to 30 points
-        
-        # Factor 3: Unmanaged groups (no accepted members)
-        unmanaged_groups = len([g for g in group_risks if g.accepted_members == 0 and g.total_members > 0])
-        if group_risks:
-            unmanaged_ratio = unmanaged_groups / len(group_risks)
-            operational_factors.append(unmanaged_ratio * 40)  # Up to 40 points
+        group_count = len(group_risks)
+        operational_factors = [
+            mixed_groups / group_count * 50,      # Up to 50 points
+            oversized_groups / group_count * 30,  # Up to 30 points
+            unmanaged_groups / group_count * 40   # Up to 40 points
+        ]
         
         return min(sum(operational_factors), 100.0)
 
 
+# Flattened (base_weight, risk_level, escalation_multiplier, max_acceptable_members)
+# per known group, so scoring a group is a single dict lookup
+_PROFILE_LUT: Dict[str, Tuple[float, GroupRiskLevel, float, int]] = {
+    name: (p.base_weight, p.risk_level, p.escalation_multiplier, p.max_acceptable_members)
+    for name, p in RiskCalculator.GROUP_PROFILES.items()
+}
+
+# Profile values for groups without a configured profile
+_DEFAULT_PROFILE_TUPLE: Tuple[float, GroupRiskLevel, float, int] = (1.0, GroupRiskLevel.LOW, 1.0, 10)
+
+
+# Domain scores memoized per distinct group data set. Services build a new
+# RiskCalculator per request, so the cache lives at module level to survive them.
+_DOMAIN_RISK_CACHE_SIZE = 256
+_domain_risk_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_domain_risk_cache_lock = threading.Lock()
+
+# Number of distinct (group_name, total_members, accepted_members) results kept
+_GROUP_RISK_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=_GROUP_RISK_CACHE_SIZE)
+def _score_group(group_name: str, total_members: int, accepted_members: int) -> DomainGroupRisk:
+    """Score a single group; pure in its arguments, so results are memoized"""
+    unaccepted_members = total_members - accepted_members
+    
+    # Get group profile values, defaulting unknown groups to a low-risk profile
+    _, risk_level, escalation_multiplier, max_acceptable_members = _PROFILE_LUT.get(
+        group_name, _DEFAULT_PROFILE_TUPLE
+    )
+    
+    # Calculate base risk from unaccepted members
+    if total_members == 0:
+        base_risk = 0.0
+    else:
+        unaccepted_ratio = unaccepted_members / total_members
+        base_risk = min(unaccepted_ratio * 100, 100)
+    
+    # Risk factors
+    contributing_factors = {}
+    
+    # Factor 1: Unaccepted member ratio
+    contributing_factors['unaccepted_ratio'] = base_risk
+    
+    # Factor 2: Absolute number of unaccepted members
+    if unaccepted_members > max_acceptable_members:
+        excess_members = unaccepted_members - max_acceptable_members
+        excess_risk = min(excess_members * 10, 50)  # Cap at 50 points
+        contributing_factors['excess_members'] = excess_risk
+    else:
+        contributing_factors['excess_members'] = 0.0
+    
+    # Factor 3: Group criticality multiplier
+    criticality_multiplier = escalation_multiplier
+    contributing_factors['criticality_multiplier'] = criticality_multiplier
+    
+    # Factor 4: Zero acceptance penalty for critical groups
+    if (risk_level == GroupRiskLevel.CRITICAL and 
+        accepted_members == 0 and total_members > 0):
+        contributing_factors['zero_acceptance_penalty'] = 25.0
+    else:
+        contributing_factors['zero_acceptance_penalty'] = 0.0
+    
+    # Calculate final risk score
+    raw_risk = (
+        contributing_factors['unaccepted_ratio'] + 
+        contributing_factors['excess_members'] +
+        contributing_factors['zero_acceptance_penalty']
+    ) * criticality_multiplier
+    
+    final_risk = min(raw_risk, 100.0)
+    
+    return DomainGroupRisk(
+        group_name=group_name,
+        total_members=total_members,
+        accepted_members=accepted_members,
+        unaccepted_members=unaccepted_members,
+        risk_score=final_risk,
+        risk_level=risk_level,
+        # Read-only view: this result is cached and shared between all callers
+        contributing_factors=MappingProxyType(contributing_factors)
+    )
+
+
 # Global risk calculator instance
 risk_calculator = RiskCalculator()
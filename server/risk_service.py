@@ -223,7 +223,7 @@ class RiskIntegrationService:
                         'total_members': gr.total_members,
                         'accepted_members': gr.accepted_members,
                         'unaccepted_members': gr.unaccepted_members,
-                        'contributing_factors': gr.contributing_factors
+                        'contributing_factors': dict(gr.contributing_factors)
                     }
                     for gr in domain_assessment.group_risks
                 ],
@@ -614,7 +614,7 @@ class RiskIntegrationService:
                     "unaccepted_members": group_risk.unaccepted_members,
                     "risk_score": group_risk.risk_score,
                     "risk_level": group_risk.risk_level.value,
-                    "contributing_factors": group_risk.contributing_factors
+                    "contributing_factors": dict(group_risk.contributing_factors)
                 })
                 
         except Exception as e:
@@ -1,387 +1,691 @@
+import atexit
+import json
 import logging
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from server.models import Report, Finding, ReportSummary, Settings, AcceptedRisk, Risk
-from typing import List, Dict
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from server.models import (
+    AcceptedRisk, Finding, Report, ReportSummary, SecurityToolType, Settings
+)
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
 
+try:
+    import orjson
+except ImportError:  # Fall back to stdlib json if orjson is not installed
+    orjson = None
 
+__all__ = ["ReportStorage", "get_storage"]
+
+# Dates are stored as ISO-8601 text; selecting a column as "name [timestamp]"
+# has the sqlite3 row builder decode it through this converter
+sqlite3.register_converter("timestamp", lambda value: datetime.fromisoformat(value.decode()))
+
+# Stored in PRAGMA user_version; bump it when adding a step to the upgrade path
+# in _create_tables so existing files run it exactly once
+_SCHEMA_VERSION = 4
+
+# Rows written before tool_type was stored all came from PingCastle uploads
+_LEGACY_TOOL_TYPE = SecurityToolType.PINGCASTLE
+
+# Reports loaded per transaction by iter_all_reports
+_REPORT_PAGE_SIZE = 100
+
+
+class _RootLoggerHandler(logging.Handler):
+    """Hand records to whatever handlers the root logger has when they are emitted."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logging.getLogger().handle(record)
+
+
+# log_alert only enqueues; a listener thread does the handler I/O so a slow log
+# sink never holds up the request that raised the alert
+_alert_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_alert_logger = logging.getLogger("donwatcher.alerts")
+_alert_logger.addHandler(QueueHandler(_alert_log_queue))
+_alert_logger.propagate = False
+_alert_listener = QueueListener(_alert_log_queue, _RootLoggerHandler())
+_alert_listener.start()
+atexit.register(_alert_listener.stop)
+
+
+_REPORT_META_COLUMNS = (
+    "rid, id, tool_type, domain, domain_sid, domain_functional_level, forest_functional_level, "
+    "maturity_level, dc_count, user_count, computer_count, "
+    "report_date AS \"report_date [timestamp]\", upload_date AS \"upload_date [timestamp]\", "
+    "pingcastle_global_score, high_score, medium_score, low_score, "
+    "stale_objects_score, privileged_accounts_score, trusts_score, anomalies_score, "
+    "html_file"
+)
+_REPORT_COLUMNS = _REPORT_META_COLUMNS + ", original_file"
+_FINDING_COLUMNS = "id, report_id, report_rid, tool_type, category, name, score, description"
+
+# reports is keyed by an INTEGER PRIMARY KEY (the rowid) so findings join on an
+# integer rather than the text report id; {table} lets the upgrade path build a
+# replacement table under a temporary name
+_REPORTS_DDL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        rid INTEGER PRIMARY KEY,
+        id TEXT UNIQUE,
+        tool_type TEXT DEFAULT 'pingcastle',
+        domain TEXT,
+        domain_sid TEXT,
+        domain_functional_level TEXT,
+        forest_functional_level TEXT,
+        maturity_level TEXT,
+        dc_count INTEGER,
+        user_count INTEGER,
+        computer_count INTEGER,
+        report_date TEXT,
+        upload_date TEXT,
+        pingcastle_global_score INTEGER,
+        high_score INTEGER,
+        medium_score INTEGER,
+        low_score INTEGER,
+        stale_objects_score INTEGER,
+        privileged_accounts_score INTEGER,
+        trusts_score INTEGER,
+        anomalies_score INTEGER,
+        original_file TEXT,
+        html_file TEXT
+    )
+"""
+# Small lookup tables addressed only by their primary key are declared
+# WITHOUT ROWID so each row is stored once, in the primary-key B-tree
+_KEYED_TABLES_DDL = {
+    "risks": """
+        CREATE TABLE IF NOT EXISTS {table} (
+            category TEXT,
+            name TEXT,
+            description TEXT,
+            PRIMARY KEY(category, name)
+        ) WITHOUT ROWID
+    """,
+    "accepted_risks": """
+        CREATE TABLE IF NOT EXISTS {table} (
+            category TEXT,
+            name TEXT,
+            PRIMARY KEY(category, name),
+            FOREIGN KEY(category, name) REFERENCES risks(category, name)
+        ) WITHOUT ROWID
+    """,
+    "settings": """
+        CREATE TABLE IF NOT EXISTS {table} (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        ) WITHOUT ROWID
+    """,
+}
+_REPORT_WRITE_COLUMNS = (
+    "id", "tool_type", "domain", "domain_sid",
+    "domain_functional_level", "forest_functional_level",
+    "maturity_level", "dc_count", "user_count", "computer_count",
+    "report_date", "upload_date",
+    "pingcastle_global_score", "high_score", "medium_score", "low_score",
+    "stale_objects_score", "privileged_accounts_score",
+    "trusts_score", "anomalies_score",
+    "original_file", "html_file",
+)
+
+# Statement text is declared once so every call hits the connection's statement cache
+# Upsert in place rather than INSERT OR REPLACE so a re-saved report keeps its rid
+_SQL_INSERT_REPORT = (
+    f"INSERT INTO reports ({', '.join(_REPORT_WRITE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(_REPORT_WRITE_COLUMNS))}) "
+    "ON CONFLICT(id) DO UPDATE SET "
+    + ", ".join(f"{col} = excluded.{col}" for col in _REPORT_WRITE_COLUMNS[1:])
+)
+_SQL_REPORT_RID = "SELECT rid FROM reports WHERE id = ?"
+_SQL_UPSERT_RISK = "INSERT OR REPLACE INTO risks (category, name, description) VALUES (?, ?, ?)"
+_SQL_INSERT_FINDING = """
+    INSERT OR REPLACE INTO findings
+    (id, report_id, report_rid, tool_type, category, name, score, description)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_UPDATE_REPORT_HTML = "UPDATE reports SET html_file = ? WHERE id = ?"
+# Keyset pages over reports by rid; a page's findings are exactly those whose
+# report_rid falls in the page's (after, last] rid range
+_SQL_REPORTS_PAGE = f"SELECT {_REPORT_COLUMNS} FROM reports WHERE rid > ? ORDER BY rid LIMIT ?"
+_SQL_FINDINGS_RID_RANGE = (
+    f"SELECT {_FINDING_COLUMNS} FROM findings WHERE report_rid > ? AND report_rid <= ?"
+)
+_SQL_REPORTS_SUMMARY = (
+    "SELECT id, tool_type, domain, domain_sid, domain_functional_level, "
+    "forest_functional_level, maturity_level, dc_count, user_count, "
+    "computer_count, report_date AS \"report_date [timestamp]\", "
+    "upload_date AS \"upload_date [timestamp]\", pingcastle_global_score, high_score, "
+    "medium_score, low_score, stale_objects_score, privileged_accounts_score, "
+    "trusts_score, anomalies_score, html_file FROM reports ORDER BY report_date"
+)
+# Same fields ReportSummary serializes to, named as the model names them; dates
+# are already ISO-8601 text so they pass through without conversion
+_SQL_REPORTS_SUMMARY_JSON = """
+    SELECT id, COALESCE(tool_type, 'pingcastle') AS tool_type, domain,
+           report_date, upload_date,
+           pingcastle_global_score AS global_score, high_score, medium_score, low_score,
+           stale_objects_score, privileged_accounts_score, trusts_score, anomalies_score,
+           domain_sid, domain_functional_level, forest_functional_level, maturity_level,
+           dc_count, user_count, computer_count,
+           NULL AS original_file, html_file,
+           0 AS total_findings, 0 AS high_severity_findings,
+           0 AS medium_severity_findings, 0 AS low_severity_findings
+    FROM reports
+    ORDER BY report_date
+"""
+_SQL_GET_REPORT = f"SELECT {_REPORT_COLUMNS} FROM reports WHERE id = ?"
+_SQL_GET_REPORT_META = f"SELECT {_REPORT_META_COLUMNS} FROM reports WHERE id = ?"
+_SQL_REPORT_FINDINGS = f"SELECT {_FINDING_COLUMNS} FROM findings WHERE report_rid = ?"
+_SQL_SCORE_HISTORY = """
+    SELECT report_date, stale_objects_score,
+           privileged_accounts_score, trusts_score, anomalies_score
+    FROM reports
+    ORDER BY report_date
+"""
+_SQL_RECURRING = """
+    WITH latest AS (
+        SELECT rid FROM reports ORDER BY report_date DESC LIMIT 1
+    )
+    SELECT 
+        a.category, 
+        a.name, 
+        COALESCE(r.description, '') AS description, 
+        a.count AS count, 
+        COALESCE(ROUND(CAST(a.sum_score AS REAL) / a.count, 1), 0.0) AS avg_score,
+        CASE WHEN EXISTS (
+            SELECT 1 
+            FROM findings lf 
+            JOIN latest ON lf.report_rid = latest.rid
+            WHERE lf.category = a.category AND lf.name = a.name
+        ) THEN 1 ELSE 0 END AS in_latest
+    FROM findings_agg a
+    LEFT JOIN risks r ON a.category = r.category AND a.name = r.name
+    ORDER BY a.count DESC
+"""
+_SQL_ADD_ACCEPTED = "INSERT OR IGNORE INTO accepted_risks (category, name) VALUES (?, ?)"
+_SQL_REMOVE_ACCEPTED = "DELETE FROM accepted_risks WHERE category = ? AND name = ?"
+_SQL_ACCEPTED_RISKS = "SELECT category, name FROM accepted_risks"
+_SQL_UNACCEPTED_REPORT_FINDINGS = f"""
+    SELECT {_FINDING_COLUMNS}
+    FROM findings f
+    WHERE f.report_rid = (SELECT rid FROM reports WHERE id = ?)
+      AND NOT EXISTS (
+          SELECT 1 FROM accepted_risks a
+          WHERE a.category = f.category AND a.name = f.name
+      )
+"""
+_SQL_SETTINGS = "SELECT key, value FROM settings"
+_SQL_SET_SETTING = "REPLACE INTO settings (key, value) VALUES (?, ?)"
+
+
+# Rows come from our own schema, so models are built with model_construct() and
+# skip pydantic validation; enum columns are therefore converted explicitly.
+
+def _finding_from_row(row: sqlite3.Row) -> Finding:
+    return Finding.model_construct(
+        id=row["id"],
+        report_id=row["report_id"],
+        tool_type=SecurityToolType(row["tool_type"] or _LEGACY_TOOL_TYPE),
+        category=row["category"],
+        name=row["name"],
+        score=row["score"],
+        description=row["description"],
+    )
+
+
+def _score_history_row(cursor: sqlite3.Cursor, row: tuple) -> Dict:
+    return {
+        "date": row[0],
+        "staleObjects": row[1],
+        "privilegedAccounts": row[2],
+        "trusts": row[3],
+        "anomalies": row[4],
+    }
+
+
+def _recurring_finding_row(cursor: sqlite3.Cursor, row: tuple) -> Dict:
+    return {
+        "category": row[0],
+        "name": row[1],
+        "description": row[2],
+        "count": row[3],
+        "avg_score": row[4],
+        "inLatest": bool(row[5])
+    }
+
+
+def _report_from_row(row: sqlite3.Row, findings: List[Finding]) -> Report:
+    return Report.model_construct(
+        id=row["id"],
+        tool_type=SecurityToolType(row["tool_type"] or _LEGACY_TOOL_TYPE),
+        domain=row["domain"],
+        domain_sid=row["domain_sid"],
+        domain_functional_level=row["domain_functional_level"],
+        forest_functional_level=row["forest_functional_level"],
+        maturity_level=row["maturity_level"],
+        dc_count=row["dc_count"],
+        user_count=row["user_count"],
+        computer_count=row["computer_count"],
+        report_date=row["report_date"],
+        upload_date=row["upload_date"],
+        global_score=row["pingcastle_global_score"],
+        high_score=row["high_score"],
+        medium_score=row["medium_score"],
+        low_score=row["low_score"],
+        stale_objects_score=row["stale_objects_score"],
+        privileged_accounts_score=row["privileged_accounts_score"],
+        trusts_score=row["trusts_score"],
+        anomalies_score=row["anomalies_score"],
+        original_file=row["original_file"] if "original_file" in row.keys() else None,
+        html_file=row["html_file"],
+        findings=findings,
+    )
+
+
+@lru_cache(maxsize=None)
 def get_storage():
+    # One shared instance so its connection and page cache survive across requests
     return ReportStorage(db_path="./reports.db")
 
 
 class ReportStorage:
     def __init__(self, db_path: str):
         self.db_path = db_path
+        self._lock = threading.Lock()
+        # (category, name) pairs; accepted risks change rarely, so this is only
+        # reloaded after add/remove/clear
+        self._accepted_cache: Optional[FrozenSet[Tuple[str, str]]] = None
+        self._conn = self._connect()
+        atexit.register(self.close)
         self._create_tables()
 
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with the per-connection performance PRAGMAs applied."""
+        # Autocommit mode: transactions are managed explicitly in _transaction()
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                               cached_statements=256, detect_types=sqlite3.PARSE_COLNAMES)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-64000")
+        conn.execute("PRAGMA busy_timeout=5000")
+        # Let long ingests grow the WAL to ~1000 pages before checkpointing
+        conn.execute("PRAGMA wal_autocheckpoint=1000")
+        # INSERT OR REPLACE must fire the findings delete trigger for findings_agg
+        conn.execute("PRAGMA recursive_triggers=ON")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _transaction(self, immediate: bool = False):
+        """Serialize access to the shared connection and run the block in one transaction.
+
+        Writers pass immediate=True to take the write lock up front rather than
+        upgrading from a read transaction mid-way.
+        """
+        with self._lock:
+            c = self._conn.cursor()
+            c.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield c
+            except BaseException:
+                self._conn.rollback()
+                raise
+            else:
+                self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            # Let SQLite refresh planner statistics gathered over the connection's lifetime
+            self._conn.execute("PRAGMA optimize")
+            self._conn.close()
+            self._conn = None
+
     def _create_tables(self):
-        with sqlite3.connect(self.db_path) as conn:
-            c = conn.cursor()
-            c.execute("""
-                CREATE TABLE IF NOT EXISTS reports (
-                    id TEXT PRIMARY KEY,
-                    domain TEXT,
-                    domain_sid TEXT,
-                    domain_functional_level TEXT,
-                    forest_functional_level TEXT,
-                    maturity_level TEXT,
-                    dc_count INTEGER,
-                    user_count INTEGER,
-                    computer_count INTEGER,
-                    report_date TEXT,
-                    upload_date TEXT,
-                    pingcastle_global_score INTEGER,
-                    high_score INTEGER,
-                    medium_score INTEGER,
-                    low_score INTEGER,
-                    stale_objects_score INTEGER,
-                    privileged_accounts_score INTEGER,
-                    trusts_score INTEGER,
-                    anomalies_score INTEGER,
-                    original_file TEXT
-                )
-            """)
-            
-            # Get existing columns
-            c.execute("PRAGMA table_info(reports)")
-            existing_columns = {row[1] for row in c.fetchall()}
-
-            # Ensure new columns exist if upgrading from an older version
-            for col_def in [
-                ("domain_sid", "TEXT"),
-                ("domain_functional_level", "TEXT"),
-                ("forest_functional_level", "TEXT"),
-                ("maturity_level", "TEXT"),
-                ("dc_count", "INTEGER"),
-                ("user_count", "INTEGER"),
-                ("computer_count", "INTEGER"),
-                ("stale_objects_score", "INTEGER"),
-                ("privileged_accounts_score", "INTEGER"),
-                ("trusts_score", "INTEGER"),
-                ("anomalies_score", "INTEGER"),
-                ("original_file", "TEXT"),
-                ("html_file", "TEXT")
-            ]:
-                if col_def[0] not in existing_columns:
-                    c.execute(f"ALTER TABLE reports ADD COLUMN {col_def[0]} {col_def[1]}")
+        # WAL is persistent in the database file: one fsync per commit and
+        # readers no longer block behind writers. It cannot be switched inside
+        # a transaction, so set it before the schema block.
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._transaction() as c:
+            c.execute("PRAGMA user_version")
+            upgrade = c.fetchone()[0] < _SCHEMA_VERSION
+
+            c.execute(_REPORTS_DDL.format(table="reports"))
+
+            if upgrade:
+                # Ensure new columns exist if upgrading from an older version
+                c.execute("PRAGMA table_info(reports)")
+                existing_columns = {row[1] for row in c.fetchall()}
+
+                for col_def in [
+                    ("tool_type", "TEXT DEFAULT 'pingcastle'"),
+                    ("domain_sid", "TEXT"),
+                    ("domain_functional_level", "TEXT"),
+                    ("forest_functional_level", "TEXT"),
+                    ("maturity_level", "TEXT"),
+                    ("dc_count", "INTEGER"),
+                    ("user_count", "INTEGER"),
+                    ("computer_count", "INTEGER"),
+                    ("stale_objects_score", "INTEGER"),
+                    ("privileged_accounts_score", "INTEGER"),
+                    ("trusts_score", "INTEGER"),
+                    ("anomalies_score", "INTEGER"),
+                    ("original_file", "TEXT"),
+                    ("html_file", "TEXT")
+                ]:
+                    if col_def[0] not in existing_columns:
+                        c.execute(f"ALTER TABLE reports ADD COLUMN {col_def[0]} {col_def[1]}")
+
+                if "rid" not in existing_columns:
+                    # An INTEGER PRIMARY KEY cannot be added with ALTER TABLE, so
+                    # copy the rows into a rebuilt table and swap it in
+                    columns = ", ".join(_REPORT_WRITE_COLUMNS)
+                    c.execute(_REPORTS_DDL.format(table="reports_new"))
+                    c.execute(f"INSERT INTO reports_new ({columns}) SELECT {columns} FROM reports")
+                    c.execute("DROP TABLE reports")
+                    c.execute("ALTER TABLE reports_new RENAME TO reports")
 
             c.execute("""
                 CREATE TABLE IF NOT EXISTS findings (
                     id TEXT PRIMARY KEY,
                     report_id TEXT,
+                    report_rid INTEGER,
+                    tool_type TEXT DEFAULT 'pingcastle',
                     category TEXT,
                     name TEXT,
                     score INTEGER,
                     description TEXT,
-                    FOREIGN KEY(report_id) REFERENCES reports(id)
+                    FOREIGN KEY(report_rid) REFERENCES reports(rid)
                 )
             """)
+            if upgrade:
+                c.execute("PRAGMA table_info(findings)")
+                finding_columns = {row[1] for row in c.fetchall()}
+                if "tool_type" not in finding_columns:
+                    c.execute("ALTER TABLE findings ADD COLUMN tool_type TEXT DEFAULT 'pingcastle'")
+                if "report_rid" not in finding_columns:
+                    c.execute("ALTER TABLE findings ADD COLUMN report_rid INTEGER REFERENCES reports(rid)")
+                    c.execute("""
+                        UPDATE findings
+                        SET report_rid = (SELECT rid FROM reports WHERE reports.id = findings.report_id)
+                    """)
+                c.execute("DROP INDEX IF EXISTS idx_findings_report_id")
+            c.execute("CREATE INDEX IF NOT EXISTS idx_findings_report_rid ON findings(report_rid)")
 
+            # Running per-(category, name) totals for get_recurring_findings,
+            # kept current by triggers instead of a GROUP BY over all findings
+            if upgrade:
+                # Recreated from findings below, so older layouts are simply dropped
+                c.execute("DROP TRIGGER IF EXISTS findings_ai")
+                c.execute("DROP TRIGGER IF EXISTS findings_ad")
+                c.execute("DROP TABLE IF EXISTS findings_agg")
             c.execute("""
-                CREATE TABLE IF NOT EXISTS risks (
+                CREATE TABLE IF NOT EXISTS findings_agg (
                     category TEXT,
                     name TEXT,
-                    description TEXT,
+                    count INTEGER DEFAULT 0,
+                    sum_score INTEGER DEFAULT 0,
                     PRIMARY KEY(category, name)
-                )
+                ) WITHOUT ROWID
             """)
-
+            if upgrade:
+                # Rebuild the totals from findings written before the triggers existed
+                c.execute("""
+                    INSERT INTO findings_agg (category, name, count, sum_score)
+                    SELECT category, name, COUNT(*), COALESCE(SUM(score), 0)
+                    FROM findings GROUP BY category, name
+                """)
             c.execute("""
-                CREATE TABLE IF NOT EXISTS accepted_risks (
-                    category TEXT,
-                    name TEXT,
-                    PRIMARY KEY(category, name),
-                    FOREIGN KEY(category, name) REFERENCES risks(category, name)
-                )
+                CREATE TRIGGER IF NOT EXISTS findings_ai AFTER INSERT ON findings
+                BEGIN
+                    INSERT INTO findings_agg (category, name, count, sum_score)
+                    VALUES (NEW.category, NEW.name, 1, COALESCE(NEW.score, 0))
+                    ON CONFLICT(category, name) DO UPDATE
+                    SET count = count + 1, sum_score = sum_score + excluded.sum_score;
+                END
+            """)
+            c.execute("""
+                CREATE TRIGGER IF NOT EXISTS findings_ad AFTER DELETE ON findings
+                BEGIN
+                    UPDATE findings_agg
+                    SET count = count - 1, sum_score = sum_score - COALESCE(OLD.score, 0)
+                    WHERE category = OLD.category AND name = OLD.name;
+                    DELETE FROM findings_agg
+                    WHERE category = OLD.category AND name = OLD.name AND count <= 0;
+                END
             """)
 
+            for table, ddl in _KEYED_TABLES_DDL.items():
+                c.execute(ddl.format(table=table))
+                if upgrade:
+                    self._rebuild_without_rowid(c, table, ddl)
+
+            # Covering indexes: get_recurring_findings groups and averages straight
+            # from idx_findings_cat_name, get_score_history reads idx_reports_date
+            # in order without a temp B-tree sort
             c.execute("""
-                CREATE TABLE IF NOT EXISTS settings (
-                    key TEXT PRIMARY KEY,
-                    value TEXT
-                )
+                CREATE INDEX IF NOT EXISTS idx_findings_cat_name
+                ON findings(category, name, score)
             """)
+            c.execute("""
+                CREATE INDEX IF NOT EXISTS idx_reports_date
+                ON reports(report_date, stale_objects_score, privileged_accounts_score,
+                           trusts_score, anomalies_score)
+            """)
+
+            if upgrade:
+                # Gather planner statistics for the new indexes; PRAGMA optimize
+                # in close() keeps them fresh afterwards
+                c.execute("ANALYZE")
+                c.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    @staticmethod
+    def _rebuild_without_rowid(c: sqlite3.Cursor, table: str, ddl: str):
+        """Copy a table created before it was declared WITHOUT ROWID into the new layout."""
+        c.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        if "WITHOUT ROWID" in c.fetchone()[0].upper():
+            return
+        c.execute(ddl.format(table=f"{table}_new"))
+        c.execute(f"INSERT INTO {table}_new SELECT * FROM {table}")
+        c.execute(f"DROP TABLE {table}")
+        c.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
 
     def clear_all_data(self):
-        with sqlite3.connect(self.db_path) as conn:
-            c = conn.cursor()
+        with self._transaction() as c:
             c.execute("DROP TABLE IF EXISTS reports")
             c.execute("DROP TABLE IF EXISTS findings")
+            c.execute("DROP TABLE IF EXISTS findings_agg")
             c.execute("DROP TABLE IF EXISTS risks")
             c.execute("DROP TABLE IF EXISTS accepted_risks")
             c.execute("DROP TABLE IF EXISTS settings")
+            self._accepted_cache = None
         self._create_tables()
 
     def save_report(self, report: Report):
-        with sqlite3.connect(self.db_path) as conn:
-            c = conn.cursor()
-            # Upsert report (insert or replace)
-            c.execute("""
-                INSERT OR REPLACE INTO reports (
-                    id, domain, domain_sid,
-                    domain_functional_level, forest_functional_level,
-                    maturity_level, dc_count, user_count, computer_count,
-                    report_date, upload_date,
-                    pingcastle_global_score, high_score, medium_score, low_score,
-                    stale_objects_score, privileged_accounts_score,
-                    trusts_score, anomalies_score,
-                    original_file, html_file
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                report.id,
-                report.domain,
-                report.domain_sid,
-                report.domain_functional_level,
-                report.forest_functional_level,
-                report.maturity_level,
-                report.dc_count,
-                report.user_count,
-                report.computer_count,
-                report.report_date.isoformat(),
-                report.upload_date.isoformat(),
-                report.pingcastle_global_score,
-                report.high_score,
-                report.medium_score,
-                report.low_score,
-                report.stale_objects_score,
-                report.privileged_accounts_score,
-                report.trusts_score,
-                report.anomalies_score,
-                report.original_file,
-                getattr(report, 'html_file', None)
-            ))
-            for f in report.findings:
-                c.execute(
-                    "INSERT OR REPLACE INTO risks (category, name, description) VALUES (?, ?, ?)",
-                    (f.category, f.name, f.description),
-                )
-                c.execute(
-                    """
-                    INSERT OR REPLACE INTO findings
-                    (id, report_id, category, name, score, description)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                    """,
-                    (f.id, f.report_id, f.category, f.name, f.score, f.description),
+        self.save_reports_bulk([report])
+
+    def save_reports_bulk(self, reports: List[Report]):
+        """Upsert many reports and their findings in a single write transaction."""
+        with self._transaction(immediate=True) as c:
+            c.executemany(_SQL_INSERT_REPORT, [
+                (
+                    report.id,
+                    report.tool_type,
+                    report.domain,
+                    report.domain_sid,
+                    report.domain_functional_level,
+                    report.forest_functional_level,
+                    report.maturity_level,
+                    report.dc_count,
+                    report.user_count,
+                    report.computer_count,
+                    report.report_date.isoformat(),
+                    report.upload_date.isoformat(),
+                    report.global_score,
+                    report.high_score,
+                    report.medium_score,
+                    report.low_score,
+                    report.stale_objects_score,
+                    report.privileged_accounts_score,
+                    report.trusts_score,
+                    report.anomalies_score,
+                    report.original_file,
+                    getattr(report, 'html_file', None)
                 )
+                for report in reports
+            ])
+            c.executemany(
+                _SQL_UPSERT_RISK,
+                [(f.category, f.name, f.description)
+                 for report in reports for f in report.findings],
+            )
+            # Resolve each report's rid once; findings reference it instead of the text id
+            rids = {}
+            for report in reports:
+                c.execute(_SQL_REPORT_RID, (report.id,))
+                rids[report.id] = c.fetchone()[0]
+            c.executemany(
+                _SQL_INSERT_FINDING,
+                [(f.id, f.report_id, rids.get(f.report_id), f.tool_type, f.category, f.name,
+                  f.score, f.description)
+                 for report in reports for f in report.findings],
+            )
 
     def update_report_html(self, report_id: str, html_file: str) -> None:
-        with sqlite3.connect(self.db_path) as conn:
-            c = conn.cursor()
-            c.execute(
-                "UPDATE reports SET html_file = ? WHERE id = ?",
-                (html_file, report_id),
-            )
+        with self._transaction() as c:
+            c.execute(_SQL_UPDATE_REPORT_HTML, (html_file, report_id))
 
     def get_all_reports(self) -> List[Report]:
-        with sqlite3.connect(self.db_path) as conn:
-            c = conn.cursor()
-            c.execute("SELECT * FROM reports")
-            report_rows = c.fetchall()
-
-            # Fetch all findings at once and group them by report_id
-            c.execute("SELECT * FROM findings")
-            finding_rows = c.fetchall()
-
-        findings_by_report = {}
-        for f in finding_rows:
-            f_obj = Finding(id=f[0], report_id=f[1], category=f[2],
-                            name=f[3], score=f[4], description=f[5])
-            findings_by_report.setdefault(f_obj.report_id, []).append(f_obj)
-
-        reports: List[Report] = []
-        for row in report_rows:
-            reports.append(Report(
-                id=row[0],
-                domain=row[1],
-                domain_sid=row[2],
-                domain_functional_level=row[3],
-                forest_functional_level=row[4],
-                maturity_level=row[5],
-                dc_count=row[6],
-                user_count=row[7],
-                computer_count=row[8],
-                report_date=datetime.fromisoformat(row[9]),
-                upload_date=datetime.fromisoformat(row[10]),
-                pingcastle_global_score=row[11],
-                high_score=row[12],
-                medium_score=row[13],
-                low_score=row[14],
-                stale_objects_score=row[15],
-                privileged_accounts_score=row[16],
-                trusts_score=row[17],
-                anomalies_score=row[18],
-                original_file=row[19],
-                html_file=row[20] if len(row) > 20 else None,
-                findings=findings_by_report.get(row[0], [])
-            ))
-
-        return reports
+        return list(self.iter_all_reports())
+
+    def iter_all_reports(self) -> Iterator[Report]:
+        """Yield reports a page at a time, loading only that page's findings.
+
+        Each page is read under the storage lock and yielded outside it, so the
+        consumer may call back into the storage while iterating. Pages are
+        separate transactions: reports saved mid-iteration may or may not appear.
+        """
+        after_rid = 0
+        while True:
+            with self._transaction() as c:
+                rows = c.execute(_SQL_REPORTS_PAGE, (after_rid, _REPORT_PAGE_SIZE)).fetchall()
+                if not rows:
+                    return
+                last_rid = rows[-1]["rid"]
+                findings_by_report = {}
+                for f in c.execute(_SQL_FINDINGS_RID_RANGE, (after_rid, last_rid)):
+                    findings_by_report.setdefault(f["report_rid"], []).append(_finding_from_row(f))
+
+            for row in rows:
+                yield _report_from_row(row, findings_by_report.pop(row["rid"], []))
+            after_rid = last_rid
 
     def get_all_reports_summary(self) -> List[ReportSummary]:
-        with sqlite3.connect(self.db_path) as conn:
-            c = conn.cursor()
-            c.execute(
-                "SELECT id, domain, domain_sid, domain_functional_level, "
-                "forest_functional_level, maturity_level, dc_count, user_count, "
-                "computer_count, report_date, upload_date, pingcastle_global_score, high_score, "
-                "medium_score, low_score, stale_objects_score, privileged_accounts_score, "
-                "trusts_score, anomalies_score, html_file FROM reports ORDER BY report_date"
-            )
+        with self._transaction() as c:
+            c.execute(_SQL_REPORTS_SUMMARY)
             rows = c.fetchall()
         return [
-            ReportSummary(
-                id=row[0],
-                domain=row[1],
-                domain_sid=row[2],
-                domain_functional_level=row[3],
-                forest_functional_level=row[4],
-                maturity_level=row[5],
-                dc_count=row[6],
-                user_count=row[7],
-                computer_count=row[8],
-                report_date=datetime.fromisoformat(row[9]),
-                upload_date=datetime.fromisoformat(row[10]),
-                pingcastle_global_score=row[11],
-                high_score=row[12],
-                medium_score=row[13],
-                low_score=row[14],
-                stale_objects_score=row[15],
-                privileged_accounts_score=row[16],
-                trusts_score=row[17],
-                anomalies_score=row[18],
+            ReportSummary.model_construct(
+                id=row["id"],
+                tool_type=SecurityToolType(row["tool_type"] or _LEGACY_TOOL_TYPE),
+                domain=row["domain"],
+                domain_sid=row["domain_sid"],
+                domain_functional_level=row["domain_functional_level"],
+                forest_functional_level=row["forest_functional_level"],
+                maturity_level=row["maturity_level"],
+                dc_count=row["dc_count"],
+                user_count=row["user_count"],
+                computer_count=row["computer_count"],
+                report_date=row["report_date"],
+                upload_date=row["upload_date"],
+                global_score=row["pingcastle_global_score"],
+                high_score=row["high_score"],
+                medium_score=row["medium_score"],
+                low_score=row["low_score"],
+                stale_objects_score=row["stale_objects_score"],
+                privileged_accounts_score=row["privileged_accounts_score"],
+                trusts_score=row["trusts_score"],
+                anomalies_score=row["anomalies_score"],
             )
             for row in rows
         ]
 
-    def get_report(self, report_id: str) -> Report:
-        with sqlite3.connect(self.db_path) as conn:
-            c = conn.cursor()
-            c.execute("SELECT * FROM reports WHERE id = ?", (report_id,))
+    def get_all_reports_summary_json(self) -> bytes:
+        """Serialize the report summaries straight from the rows, without building models."""
+        with self._transaction() as c:
+            c.execute(_SQL_REPORTS_SUMMARY_JSON)
+            summaries = [dict(row) for row in c]
+        if orjson is not None:
+            return orjson.dumps(summaries)
+        return json.dumps(summaries).encode()
+
+    def get_report(self, report_id: str, include_original_file: bool = True) -> Report:
+        """Load one report; pass include_original_file=False to skip the raw upload body."""
+        query = _SQL_GET_REPORT if include_original_file else _SQL_GET_REPORT_META
+        with self._transaction() as c:
+            c.execute(query, (report_id,))
             row = c.fetchone()
             if not row:
                 raise ValueError("Report not found")
-            c.execute("SELECT * FROM findings WHERE report_id = ?", (report_id,))
+            c.execute(_SQL_REPORT_FINDINGS, (row["rid"],))
             fr = c.fetchall()
-        findings = [
-            Finding(id=f[0], report_id=f[1], category=f[2], name=f[3], score=f[4], description=f[5])
-            for f in fr
-        ]
-        return Report(
-            id=row[0],
-            domain=row[1],
-            domain_sid=row[2],
-            domain_functional_level=row[3],
-            forest_functional_level=row[4],
-            maturity_level=row[5],
-            dc_count=row[6],
-            user_count=row[7],
-            computer_count=row[8],
-            report_date=datetime.fromisoformat(row[9]),
-            upload_date=datetime.fromisoformat(row[10]),
-            global_score=row[11],
-            high_score=row[12],
-            medium_score=row[13],
-            low_score=row[14],
-            stale_objects_score=row[15],
-            privileged_accounts_score=row[16],
-            trusts_score=row[17],
-            anomalies_score=row[18],
-            original_file=row[19],
-            html_file=row[20] if len(row) > 20 else None,
-            findings=findings,
-        )
+        return _report_from_row(row, [_finding_from_row(f) for f in fr])
 
     def get_score_history(self) -> List[Dict]:
-        with sqlite3.connect(self.db_path) as conn:
-            c = conn.cursor()
-            c.execute("""
-              SELECT report_date, stale_objects_score,
-                     privileged_accounts_score, trusts_score, anomalies_score
-              FROM reports
-              ORDER BY report_date
-            """)
-            rows = c.fetchall()
-        return [
-          {
-            "date": row[0],
-            "staleObjects": row[1],
-            "privilegedAccounts": row[2],
-            "trusts": row[3],
-            "anomalies": row[4],
-          }
-          for row in rows
-        ]
+        with self._transaction() as c:
+            c.row_factory = _score_history_row
+            c.execute(_SQL_SCORE_HISTORY)
+            return c.fetchall()
 
     def get_recurring_findings(self) -> List[Dict]:
-        with sqlite3.connect(self.db_path) as conn:
-            c = conn.cursor()
-            c.execute(
-                """
-                WITH latest AS (
-                    SELECT id FROM reports ORDER BY report_date DESC LIMIT 1
-                )
-                SELECT 
-                    f.category, 
-                    f.name, 
-                    r.description, 
-                    COUNT(*) AS count, 
-                    AVG(f.score) AS avg_score,
-                    CASE WHEN EXISTS (
-                        SELECT 1 
-                        FROM findings lf 
-                        JOIN latest ON lf.report_id = latest.id
-                        WHERE lf.category = f.category AND lf.name = f.name
-                    ) THEN 1 ELSE 0 END AS in_latest
-                FROM findings f
-                LEFT JOIN risks r ON f.category = r.category AND f.name = r.name
-                GROUP BY f.category, f.name, r.description
-                ORDER BY count DESC
-                """
-            )
-            rows = c.fetchall()
-        return [
-            {
-                "category": row[0],
-                "name": row[1],
-                "description": row[2] or "",
-                "count": row[3],
-                "avg_score": round(row[4], 1) if row[4] else 0,
-                "inLatest": bool(row[5])
-            }
-            for row in rows
-        ]
+        with self._transaction() as c:
+            c.row_factory = _recurring_finding_row
+            c.execute(_SQL_RECURRING)
+            return c.fetchall()
 
     def add_accepted_risk(self, category: str, name: str):
-        with sqlite3.connect(self.db_path) as conn:
-            c = conn.cursor()
-            c.execute(
-                "INSERT OR IGNORE INTO accepted_risks (category, name) VALUES (?, ?)",
-                (category, name),
-            )
+        with self._transaction() as c:
+            c.execute(_SQL_ADD_ACCEPTED, (category, name))
+            self._accepted_cache = None
 
     def remove_accepted_risk(self, category: str, name: str):
-        with sqlite3.connect(self.db_path) as conn:
-            c = conn.cursor()
-            c.execute(
-                "DELETE FROM accepted_risks WHERE category = ? AND name = ?",
-                (category, name),
-            )
+        with self._transaction() as c:
+            c.execute(_SQL_REMOVE_ACCEPTED, (category, name))
+            self._accepted_cache = None
+
+    def _accepted_pairs(self) -> FrozenSet[Tuple[str, str]]:
+        accepted = self._accepted_cache
+        if accepted is None:
+            with self._transaction() as c:
+                c.execute(_SQL_ACCEPTED_RISKS)
+                accepted = frozenset((r["category"], r["name"]) for r in c)
+                self._accepted_cache = accepted
+        return accepted
 
     def get_accepted_risks(self) -> List[AcceptedRisk]:
-        with sqlite3.connect(self.db_path) as conn:
-            c = conn.cursor()
-            c.execute("SELECT category, name FROM accepted_risks")
-            rows = c.fetchall()
-        return [AcceptedRisk(category=r[0], name=r[1]) for r in rows]
+        return [AcceptedRisk.model_construct(tool_type=_LEGACY_TOOL_TYPE, category=category, name=name)
+                for category, name in self._accepted_pairs()]
 
     def get_unaccepted_findings(self, findings: List[Finding]) -> List[Finding]:
-        accepted = {(r.category, r.name) for r in self.get_accepted_risks()}
+        accepted = self._accepted_pairs()
         return [f for f in findings if (f.category, f.name) not in accepted]
 
+    def get_unaccepted_findings_for_report(self, report_id: str) -> List[Finding]:
+        """Anti-join against accepted_risks in SQL using its (category, name) primary key."""
+        with self._transaction() as c:
+            c.execute(_SQL_UNACCEPTED_REPORT_FINDINGS, (report_id,))
+            rows = c.fetchall()
+        return [_finding_from_row(f) for f in rows]
+
     def get_settings(self) -> Settings:
-        with sqlite3.connect(self.db_path) as conn:
-            c = conn.cursor()
-            c.execute("SELECT key, value FROM settings")
+        with self._transaction() as c:
+            c.execute(_SQL_SETTINGS)
             rows = c.fetchall()
         data = {k: v for k, v in rows}
         return Settings(
@@ -390,16 +694,11 @@ class ReportStorage:
         )
 
     def update_settings(self, webhook_url: str, alert_message: str):
-        with sqlite3.connect(self.db_path) as conn:
-            c = conn.cursor()
-            c.execute(
-                "REPLACE INTO settings (key, value) VALUES ('webhook_url', ?)",
-                (webhook_url,),
-            )
-            c.execute(
-                "REPLACE INTO settings (key, value) VALUES ('alert_message', ?)",
-                (alert_message,),
+        with self._transaction() as c:
+            c.executemany(
+                _SQL_SET_SETTING,
+                [("webhook_url", webhook_url), ("alert_message", alert_message)],
             )
 
     def log_alert(self, message: str):
-        logging.info(message)
+        _alert_logger.info(message)
@@ -1,5 +1,8 @@
 import logging
+import time
+from dataclasses import asdict, is_dataclass
 from datetime import datetime, timezone
+from itertools import islice
 from typing import List, Dict, Optional, Tuple
 from uuid import uuid4
 import json
@@ -8,6 +11,11 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text, and_, or_, desc, asc, func
 from sqlalchemy.exc import IntegrityError
 
+try:
+    import orjson
+except ImportError:  # Fall back to stdlib json if orjson is not installed
+    orjson = None
+
 from server.database import get_db, SessionLocal
 from server.models import (
     Report, Finding, ReportSummary, Settings, AcceptedRisk, Risk,
@@ -15,6 +23,21 @@ from server.models import (
     GroupMembershipChange
 )
 
+def _json_default(value):
+    """Serialize dataclass records (e.g. compact group members) for stdlib json."""
+    if is_dataclass(value):
+        return asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _dump_json(value) -> str:
+    """Serialize metadata for a JSONB column, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(value, default=_json_default)
+
+# Findings are written in batches of this size to bound per-statement parameter memory
+FINDINGS_BATCH_SIZE = 500
+
 def get_storage():
     """Get storage instance - for dependency injection."""
     return PostgresReportStorage()
@@ -22,6 +45,14 @@ def get_storage():
 class PostgresReportStorage:
     """PostgreSQL-based storage implementation."""
     
+    # Settings change rarely but are read on every upload; a new storage
+    # instance is created per request, so the cache lives on the class.
+    # The cache is per process: update_settings() only invalidates the worker
+    # that handled it, so other uvicorn workers may serve the previous settings
+    # for up to SETTINGS_CACHE_TTL_SECONDS after a change.
+    SETTINGS_CACHE_TTL_SECONDS = 10
+    _settings_cache: Optional[Tuple[float, Settings]] = None
+    
     def __init__(self):
         self.db_session = SessionLocal
 
@@ -61,7 +92,7 @@ class PostgresReportStorage:
                         'upload_date': report.upload_date,
                         'domain_sid': report.domain_sid,
                         'original_file': report.original_file,
-                        'metadata': json.dumps(report.metadata)
+                        'metadata': _dump_json(report.metadata)
                     })
                 else:
                     # For PingCastle and other tools, save full report data
@@ -113,7 +144,7 @@ class PostgresReportStorage:
                     'computer_count': report.computer_count or 0,
                     'original_file': report.original_file,
                     'html_file': report.html_file,
-                    'metadata': json.dumps(report.metadata)
+                    'metadata': _dump_json(report.metadata)
                 })
                     except Exception as e:
                         if "pingcastle_global_score" in str(e):
@@ -164,25 +195,27 @@ class PostgresReportStorage:
                                 'computer_count': report.computer_count or 0,
                                 'original_file': report.original_file,
                                 'html_file': report.html_file,
-                                'metadata': json.dumps(report.metadata)
+                                'metadata': _dump_json(report.metadata)
                             })
                         else:
                             raise
 
-                # Save findings and calculate stats for KPIs
+                # Save findings in fixed-size batches and calculate stats for KPIs
                 findings_stats = {'total': 0, 'high': 0, 'medium': 0, 'low': 0}
-                for finding in report.findings:
-                    self._save_finding(session, finding)
-                    self._save_risk_to_catalog(session, finding)
-                    # Count findings by severity for KPIs
-                    findings_stats['total'] += 1
-                    severity = finding.severity.lower() if finding.severity else 'medium'
-                    if severity == 'high':
-                        findings_stats['high'] += 1
-                    elif severity == 'medium':
-                        findings_stats['medium'] += 1
-                    elif severity == 'low':
-                        findings_stats['low'] += 1
+                findings_iter = iter(report.findings)
+                while batch := list(islice(findings_iter, FINDINGS_BATCH_SIZE)):
+                    self._save_findings(session, batch)
+                    self._save_risks_to_catalog(session, batch)
+                    for finding in batch:
+                        # Count findings by severity for KPIs
+                        findings_stats['total'] += 1
+                        severity = finding.severity.lower() if finding.severity else 'medium'
+                        if severity == 'high':
+                            findings_stats['high'] += 1
+                        elif severity == 'medium':
+                            findings_stats['medium'] += 1
+                        elif severity == 'low':
+                            findings_stats['low'] += 1
 
                 session.commit()
                 logging.info(f"Saved report {report.id} with {len(report.findings)} findings")
@@ -265,8 +298,8 @@ class PostgresReportStorage:
                 else:
                     raise
 
-    def _save_finding(self, session: Session, finding: Finding):
-        """Save a finding to the database."""
+    def _save_findings(self, session: Session, findings: List[Finding]):
+        """Save a batch of findings to the database in a single executemany."""
         session.execute(text("""
             INSERT INTO findings (
                 id, report_id, tool_type, category, name, score,
@@ -283,22 +316,25 @@ class PostgresReportStorage:
                 status = EXCLUDED.status,
                 metadata = EXCLUDED.metadata,
                 updated_at = NOW()
-        """), {
-            'id': finding.id,
-            'report_id': finding.report_id,
-            'tool_type': finding.tool_type.value,
-            'category': finding.category,
-            'name': finding.name,
-            'score': finding.score,
-            'severity': finding.severity,
-            'description': finding.description,
-            'recommendation': finding.recommendation,
-            'status': finding.status.value,
-            'metadata': json.dumps(finding.metadata)
-        })
-
-    def _save_risk_to_catalog(self, session: Session, finding: Finding):
-        """Save risk to the master catalog."""
+        """), [
+            {
+                'id': finding.id,
+                'report_id': finding.report_id,
+                'tool_type': finding.tool_type.value,
+                'category': finding.category,
+                'name': finding.name,
+                'score': finding.score,
+                'severity': finding.severity,
+                'description': finding.description,
+                'recommendation': finding.recommendation,
+                'status': finding.status.value,
+                'metadata': _dump_json(finding.metadata)
+            }
+            for finding in findings
+        ])
+
+    def _save_risks_to_catalog(self, session: Session, findings: List[Finding]):
+        """Save the risks for a batch of findings to the master catalog."""
         session.execute(text("""
             INSERT INTO risks (tool_type, category, name, description, recommendation, severity)
             VALUES (:tool_type, :category, :name, :description, :recommendation, :severity)
@@ -307,14 +343,17 @@ class PostgresReportStorage:
                 recommendation = EXCLUDED.recommendation,
                 severity = EXCLUDED.severity,
                 updated_at = NOW()
-        """), {
-            'tool_type': finding.tool_type.value,
-            'category': finding.category,
-            'name': finding.name,
-            'description': finding.description,
-            'recommendation': finding.recommendation,
-            'severity': finding.severity
-        })
+        """), [
+            {
+                'tool_type': finding.tool_type.value,
+                'category': finding.category,
+                'name': finding.name,
+                'description': finding.description,
+                'recommendation': finding.recommendation,
+                'severity': finding.severity
+            }
+            for finding in findings
+        ])
 
     def _ensure_risk_in_catalog(self, session: Session, tool_type: SecurityToolType, category: str, name: str):
         """Ensure a risk exists in the catalog, creating it if necessary."""
@@ -812,7 +851,14 @@ class PostgresReportStorage:
 
     # Settings Management
     def get_settings(self) -> Settings:
-        """Get application settings."""
+        """Get application settings (cached for SETTINGS_CACHE_TTL_SECONDS).
+        
+        Each caller gets its own copy, so mutating it never leaks into the cache.
+        """
+        cached = PostgresReportStorage._settings_cache
+        if cached is not None and time.monotonic() - cached[0] < self.SETTINGS_CACHE_TTL_SECONDS:
+            return cached[1].model_copy()
+        
         with self._get_session() as session:
             results = session.execute(text("""
                 SELECT key, value FROM settings
@@ -821,12 +867,14 @@ class PostgresReportStorage:
 
             settings_dict = {r.key: r.value for r in results}
             
-            return Settings(
+            settings = Settings(
                 webhook_url=settings_dict.get('webhook_url', ''),
                 alert_message=settings_dict.get('alert_message', ''),
                 retention_days=int(settings_dict.get('retention_days', 365)),
                 auto_accept_low_severity=settings_dict.get('auto_accept_low_severity', 'false').lower() == 'true'
             )
+            PostgresReportStorage._settings_cache = (time.monotonic(), settings)
+            return settings.model_copy()
 
     def update_settings(self, webhook_url: str, alert_message: str, 
                        retention_days: int = None, auto_accept_low_severity: bool = None):
@@ -856,6 +904,7 @@ class PostgresReportStorage:
                 """), {'auto_accept_low_severity': str(auto_accept_low_severity).lower()})
 
             session.commit()
+            PostgresReportStorage._settings_cache = None
 
     # Group Management
     def get_monitored_groups(self) -> List[MonitoredGroup]:
@@ -954,26 +1003,27 @@ class PostgresReportStorage:
                 {'domain': domain}
             ).scalar() or 0
             
-            # Get report IDs for this domain
-            report_ids = [r[0] for r in session.execute(
-                text("SELECT id FROM reports WHERE domain = :domain"),
-                {'domain': domain}
-            ).fetchall()]
-            
             findings_count = 0
             memberships_count = 0
             
-            if report_ids:
-                # Delete findings for these reports
+            if report_count:
+                # Delete findings for this domain's reports; the report ids stay
+                # server-side as native UUIDs instead of round-tripping as text
                 findings_count = session.execute(
-                    text("DELETE FROM findings WHERE report_id = ANY(:report_ids)"),
-                    {'report_ids': report_ids}
+                    text("""
+                        DELETE FROM findings
+                        WHERE report_id IN (SELECT id FROM reports WHERE domain = :domain)
+                    """),
+                    {'domain': domain}
                 ).rowcount or 0
                 
-                # Delete group memberships for these reports
+                # Delete group memberships for this domain's reports
                 memberships_count = session.execute(
-                    text("DELETE FROM group_memberships WHERE report_id = ANY(:report_ids)"),
-                    {'report_ids': report_ids}
+                    text("""
+                        DELETE FROM group_memberships
+                        WHERE report_id IN (SELECT id FROM reports WHERE domain = :domain)
+                    """),
+                    {'domain': domain}
                 ).rowcount or 0
             
             # Delete accepted group members for this domain
@@ -2621,67 +2671,86 @@ class PostgresReportStorage:
                     "categories": {}
                 }
 
-    def get_domain_groups_fast(self, domain: str) -> List[Dict]:
+    def get_domain_groups_fast(
+        self,
+        domain: str,
+        limit: Optional[int] = None,
+        after_score: Optional[int] = None,
+        after_group: Optional[str] = None
+    ) -> List[Dict]:
         """
         Get domain groups using pre-calculated view for fast loading.
         
+        The summary lookup and the per-group findings scan run as a single
+        statement. Results are ordered by risk score (then group name) and can
+        be paged with a keyset: pass the risk_score and group_name of the last
+        row from the previous page as after_score / after_group.
+        
         Args:
             domain: Domain to get groups for
+            limit: Maximum number of groups to return (None for all; must be positive)
+            after_score: Keyset cursor - risk score of the last row already seen
+            after_group: Keyset cursor - group name of the last row already seen
             
         Returns:
             List of group information with acceptance status
         """
+        if limit is not None and limit < 1:
+            raise ValueError(f"limit must be a positive integer, got {limit}")
+        
         with self._get_session() as session:
             try:
-                # First get summary from view
-                summary = session.execute(text("""
-                    SELECT 
-                        report_id,
-                        domain,
-                        report_date,
-                        total_groups,
-                        total_group_members,
-                        accepted_group_members,
-                        unaccepted_group_members,
-                        domain_group_risk_score
-                    FROM v_domain_group_summary
-                    WHERE domain = :domain
-                """), {'domain': domain}).fetchone()
-                
-                if not summary:
-                    return []
-                
-                # Get individual group details from findings metadata
                 groups = session.execute(text("""
+                    WITH s AS (
+                        SELECT report_id, report_date
+                        FROM v_domain_group_summary
+                        WHERE domain = :domain
+                    )
                     SELECT 
-                        f.metadata->>'group_name' as group_name,
-                        (f.metadata->>'member_count')::int as total_members,
-                        f.score as risk_score,
-                        (
-                            SELECT COUNT(*) 
-                            FROM accepted_group_members agm 
-                            WHERE agm.domain = :domain 
-                              AND agm.group_name = f.metadata->>'group_name'
-                        ) as accepted_members
-                    FROM findings f
-                    WHERE f.report_id = :report_id
-                      AND f.category = 'DonScanner'
-                      AND f.name LIKE 'Group_%'
-                    ORDER BY f.score DESC
-                """), {'domain': domain, 'report_id': str(summary.report_id)}).fetchall()
+                        g.group_name,
+                        g.total_members,
+                        g.accepted_members,
+                        g.total_members - g.accepted_members as unaccepted_members,
+                        g.risk_score,
+                        g.severity_bucket as severity,
+                        s.report_date as last_updated
+                    FROM s
+                    JOIN LATERAL (
+                        SELECT 
+                            f.metadata->>'group_name' as group_name,
+                            COALESCE((f.metadata->>'member_count')::int, 0) as total_members,
+                            COALESCE(f.score, 0) as risk_score,
+                            f.severity_bucket,
+                            (
+                                SELECT COUNT(*) 
+                                FROM accepted_group_members agm 
+                                WHERE agm.domain = :domain 
+                                  AND agm.group_name = f.metadata->>'group_name'
+                            ) as accepted_members
+                        FROM findings f
+                        WHERE f.report_id = s.report_id
+                          AND f.category = 'DonScanner'
+                          AND f.name LIKE 'Group_%'
+                          AND COALESCE(f.metadata->>'group_name', '') <> ''
+                          -- Filter and order on the same COALESCEd score the API returns,
+                          -- so NULL scores page as 0 instead of sorting first or being skipped
+                          AND (
+                              CAST(:after_score AS INTEGER) IS NULL
+                              OR (COALESCE(f.score, 0), f.metadata->>'group_name')
+                                 < (CAST(:after_score AS INTEGER), CAST(:after_group AS TEXT))
+                          )
+                        ORDER BY COALESCE(f.score, 0) DESC, f.metadata->>'group_name' DESC
+                        LIMIT :limit
+                    ) g ON TRUE
+                """), {
+                    'domain': domain,
+                    'limit': limit,
+                    'after_score': after_score,
+                    'after_group': after_group or ''
+                }).mappings().all()
                 
-                return [
-                    {
-                        'group_name': g.group_name,
-                        'total_members': g.total_members or 0,
-                        'accepted_members': g.accepted_members or 0,
-                        'unaccepted_members': (g.total_members or 0) - (g.accepted_members or 0),
-                        'risk_score': g.risk_score or 0,
-                        'severity': 'high' if (g.risk_score or 0) > 50 else 'medium' if (g.risk_score or 0) > 25 else 'low',
-                        'last_updated': summary.report_date.isoformat() if summary.report_date else None
-                    }
-                    for g in groups if g.group_name
-                ]
+                # Rows are already shaped for the API; FastAPI encodes last_updated as ISO 8601
+                return [dict(g) for g in groups]
             except Exception as e:
                 logging.warning(f"Fast domain groups query failed: {e}")
                 # Fallback to regular method (imported at call time to avoid circular import)
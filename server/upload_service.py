@@ -5,8 +5,13 @@ This module provides a centralized service for processing report uploads,
 whether they come from file uploads (UI) or programmatic API calls.
 """
 
+import asyncio
 import logging
+import os
+from collections import ChainMap
+from dataclasses import dataclass
 from datetime import datetime
+from functools import cached_property
 from pathlib import Path
 from typing import Optional, List, Dict, Any, Tuple
 from uuid import uuid4
@@ -16,7 +21,69 @@ from server.models import (
     APIUploadRequest, APIUploadResponse, APIFindingInput, APIGroupData,
     GroupMembership, MemberType
 )
-from server.storage_postgres import PostgresReportStorage
+from server.storage_postgres import PostgresReportStorage, get_storage
+from server.alerter import Alerter
+from server.risk_service import RiskIntegrationService, get_risk_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class _DefaultDomainMetadata:
+    """Fallback domain metadata used when an upload omits domain_metadata."""
+    domain_sid: Optional[str] = None
+    domain_functional_level: Optional[str] = None
+    forest_functional_level: Optional[str] = None
+    maturity_level: Optional[str] = None
+    dc_count: Optional[int] = None
+    user_count: Optional[int] = None
+    computer_count: Optional[int] = None
+
+
+@dataclass(frozen=True, slots=True)
+class _DefaultPingCastleScores:
+    """Fallback PingCastle scores used when an upload omits pingcastle_scores."""
+    global_score: Optional[int] = None
+    stale_objects_score: Optional[int] = 0
+    privileged_accounts_score: Optional[int] = 0
+    trusts_score: Optional[int] = 0
+    anomalies_score: Optional[int] = 0
+
+
+@dataclass(frozen=True, slots=True)
+class _GroupMemberRecord:
+    """
+    Compact member entry for group finding metadata.
+    
+    Uses far less memory than a per-member dict for large groups and is
+    serialized to the same JSON object shape when the finding is saved.
+    """
+    name: str
+    samaccountname: str
+    sid: str
+    type: str
+    enabled: Optional[bool]
+
+
+# Quiet period before a requested materialized view refresh runs, so a burst
+# of uploads collapses into a single trailing refresh.
+REFRESH_DEBOUNCE_MS = int(os.getenv("REFRESH_DEBOUNCE_MS", "2000"))
+
+# Tool types whose uploads carry domain group data
+_GROUP_TOOL_TYPES = frozenset({
+    SecurityToolType.DOMAIN_ANALYSIS,
+    SecurityToolType.DOMAIN_GROUP_MEMBERS
+})
+
+# Privileged group tiers used for upload-time group scoring
+_HIGH_RISK_GROUPS = frozenset({'Domain Admins', 'Enterprise Admins', 'Schema Admins'})
+_MEDIUM_RISK_GROUPS = frozenset({'Administrators', 'Account Operators', 'Backup Operators'})
+
+# Metadata stamped onto every API-uploaded report
+_API_UPLOAD_METADATA = {'upload_method': 'api', 'api_version': '1.0'}
+
+_DEFAULT_DOMAIN_META = _DefaultDomainMetadata()
+_DEFAULT_PC_SCORES = _DefaultPingCastleScores()
 
 
 class UploadService:
@@ -31,10 +98,28 @@ class UploadService:
     - Handling group memberships
     """
     
+    # Shared across instances (one is created per request) so concurrent
+    # uploads coalesce into a single trailing materialized view refresh.
+    # asyncio primitives bind to the loop that first uses them, so they are
+    # created lazily and recreated whenever a different loop is running.
+    _refresh_loop: Optional[asyncio.AbstractEventLoop] = None
+    _refresh_pending: Optional[asyncio.Event] = None
+    _refresh_worker: Optional[asyncio.Task] = None
+    
     def __init__(self, storage: PostgresReportStorage):
         self.storage = storage
         self.logger = logging.getLogger(__name__)
     
+    @cached_property
+    def alerter(self) -> Alerter:
+        """Alerter bound to this service's storage, built on first use."""
+        return Alerter(self.storage)
+    
+    @cached_property
+    def risk_service(self) -> RiskIntegrationService:
+        """Risk service bound to this service's storage, built on first use."""
+        return get_risk_service(self.storage)
+    
     async def process_api_upload(
         self,
         request: APIUploadRequest
@@ -58,25 +143,25 @@ class UploadService:
             
             # Process group data if provided (for domain_analysis)
             groups_processed = 0
-            if request.groups and request.tool_type in [
-                SecurityToolType.DOMAIN_ANALYSIS, 
-                SecurityToolType.DOMAIN_GROUP_MEMBERS
-            ]:
-                group_findings = self._create_group_findings(report_id, request)
-                findings.extend(group_findings)
+            if request.groups and request.tool_type in _GROUP_TOOL_TYPES:
+                findings.extend(self._create_group_findings(report_id, request))
                 groups_processed = len(request.groups)
             
             # Build the report object
             report = self._build_report(report_id, report_date, request, findings)
             
-            # Save to database
-            saved_report_id = self.storage.save_report(report)
+            # Save to database (off the event loop so other requests keep flowing)
+            saved_report_id = await asyncio.to_thread(self.storage.save_report, report)
             
             # Handle group memberships for domain analysis reports
             if request.tool_type == SecurityToolType.DOMAIN_ANALYSIS and request.groups:
-                memberships = self._extract_memberships_from_groups(report, request.groups)
+                memberships = await asyncio.to_thread(
+                    self._extract_memberships_from_groups, report, request.groups
+                )
                 if memberships:
-                    self.storage.save_group_memberships(saved_report_id, memberships)
+                    await asyncio.to_thread(
+                        self.storage.save_group_memberships, saved_report_id, memberships
+                    )
                 
                 # Trigger risk calculation
                 await self._update_risk_scores(request.domain)
@@ -86,6 +171,9 @@ class UploadService:
             if request.send_alert:
                 alert_sent = await self._send_alert_if_needed(report)
             
+            # Refresh materialized views in the background so the response returns first
+            self._request_refresh()
+            
             return APIUploadResponse(
                 status="success",
                 report_id=saved_report_id,
@@ -111,10 +199,8 @@ class UploadService:
         request: APIUploadRequest
     ) -> List[Finding]:
         """Create Finding objects from API request findings data."""
-        findings = []
-        
-        for finding_input in request.findings:
-            finding = Finding(
+        return [
+            Finding(
                 id=str(uuid4()),
                 report_id=report_id,
                 tool_type=request.tool_type,
@@ -127,9 +213,8 @@ class UploadService:
                 status=FindingStatus.NEW,
                 metadata=finding_input.metadata
             )
-            findings.append(finding)
-        
-        return findings
+            for finding_input in request.findings
+        ]
     
     def _create_group_findings(
         self,
@@ -142,18 +227,7 @@ class UploadService:
         for group_data in request.groups:
             member_count = len(group_data.members)
             
-            # Process members into the expected format
-            processed_members = []
-            for member in group_data.members:
-                processed_members.append({
-                    'name': member.name,
-                    'samaccountname': member.samaccountname or '',
-                    'sid': member.sid or '',
-                    'type': member.type,
-                    'enabled': member.enabled
-                })
-            
-            finding = Finding(
+            findings.append(Finding(
                 id=str(uuid4()),
                 report_id=report_id,
                 tool_type=SecurityToolType.DOMAIN_ANALYSIS,
@@ -167,13 +241,21 @@ class UploadService:
                 metadata={
                     'group_name': group_data.group_name,
                     'member_count': member_count,
-                    'members': processed_members,
+                    'members': [
+                        _GroupMemberRecord(
+                            member.name,
+                            member.samaccountname or '',
+                            member.sid or '',
+                            member.type,
+                            member.enabled
+                        )
+                        for member in group_data.members
+                    ],
                     'group_sid': group_data.group_sid or '',
                     'group_type': group_data.group_type,
                     'upload_method': 'api'
                 }
-            )
-            findings.append(finding)
+            ))
         
         return findings
     
@@ -186,24 +268,10 @@ class UploadService:
     ) -> Report:
         """Build a Report object from API request data."""
         # Extract domain metadata if provided
-        domain_metadata = request.domain_metadata or type('obj', (object,), {
-            'domain_sid': None,
-            'domain_functional_level': None,
-            'forest_functional_level': None,
-            'maturity_level': None,
-            'dc_count': None,
-            'user_count': None,
-            'computer_count': None
-        })()
+        domain_metadata = request.domain_metadata or _DEFAULT_DOMAIN_META
         
         # Extract PingCastle scores if provided
-        pc_scores = request.pingcastle_scores or type('obj', (object,), {
-            'global_score': None,
-            'stale_objects_score': 0,
-            'privileged_accounts_score': 0,
-            'trusts_score': 0,
-            'anomalies_score': 0
-        })()
+        pc_scores = request.pingcastle_scores or _DEFAULT_PC_SCORES
         
         # Calculate global score from category scores if not provided
         global_score = pc_scores.global_score
@@ -215,10 +283,9 @@ class UploadService:
                 (pc_scores.anomalies_score or 0)
             )
         
-        # Build metadata
-        metadata = request.metadata.copy()
-        metadata['upload_method'] = 'api'
-        metadata['api_version'] = '1.0'
+        # Overlay upload markers on the request metadata without copying it;
+        # Report validation flattens the ChainMap into its own dict once
+        metadata = ChainMap(_API_UPLOAD_METADATA, request.metadata)
         
         return Report(
             id=report_id,
@@ -297,9 +364,7 @@ class UploadService:
     async def _update_risk_scores(self, domain: str) -> None:
         """Update risk scores after group data upload."""
         try:
-            from server.risk_service import get_risk_service
-            risk_service = get_risk_service(self.storage)
-            await risk_service.calculate_and_store_global_risk(domain)
+            await self.risk_service.calculate_and_store_global_risk(domain)
             self.logger.info(f"Updated risk scores for domain {domain} after API upload")
         except Exception as e:
             self.logger.warning(f"Failed to update risk scores after upload: {e}")
@@ -307,27 +372,59 @@ class UploadService:
     async def _send_alert_if_needed(self, report: Report) -> bool:
         """Send alert for unaccepted findings if webhook is configured."""
         try:
-            unaccepted = self.storage.get_unaccepted_findings(report.findings)
+            # Check the (cached) settings first so uploads without a webhook
+            # skip the accepted-risks query entirely
+            settings = await asyncio.to_thread(self.storage.get_settings)
+            if not settings.webhook_url:
+                return False
+            
+            unaccepted = await asyncio.to_thread(
+                self.storage.get_unaccepted_findings, report.findings
+            )
             if unaccepted:
-                settings = self.storage.get_settings()
-                if settings.webhook_url:
-                    from server.alerter import Alerter
-                    alerter = Alerter(self.storage)
-                    alerter.send_alert(settings, report, unaccepted)
-                    return True
+                await asyncio.to_thread(self.alerter.send_alert, settings, report, unaccepted)
+                return True
         except Exception as e:
             self.logger.warning(f"Failed to send alert: {e}")
         return False
     
+    @classmethod
+    def _request_refresh(cls) -> None:
+        """Request a debounced materialized view refresh."""
+        loop = asyncio.get_running_loop()
+        if cls._refresh_loop is not loop:
+            cls._refresh_loop = loop
+            cls._refresh_pending = asyncio.Event()
+            cls._refresh_worker = None
+        
+        cls._refresh_pending.set()
+        # Only one worker per loop; create_task runs synchronously, so the
+        # done() check cannot race with another request on the same loop
+        worker = cls._refresh_worker
+        if worker is None or worker.done():
+            cls._refresh_worker = asyncio.create_task(cls._refresh_views_worker())
+    
+    @classmethod
+    async def _refresh_views_worker(cls) -> None:
+        """Wait out the debounce window, then refresh once per burst of requests."""
+        pending = cls._refresh_pending
+        while pending.is_set():
+            await asyncio.sleep(REFRESH_DEBOUNCE_MS / 1000)
+            pending.clear()
+            try:
+                # Own storage instance: the requesting one belongs to a finished request
+                await asyncio.to_thread(get_storage().refresh_materialized_views)
+                logger.info("Refreshed materialized views after report upload")
+            except Exception as e:
+                # Don't let one failed refresh kill the worker or drop later requests
+                logger.warning(f"Materialized view refresh failed (non-critical): {e}")
+    
     def _calculate_group_risk_score(self, group_name: str, member_count: int) -> int:
         """Calculate risk score based on group type and member count."""
-        high_risk_groups = ['Domain Admins', 'Enterprise Admins', 'Schema Admins']
-        medium_risk_groups = ['Administrators', 'Account Operators', 'Backup Operators']
-        
         base_score = 0
-        if group_name in high_risk_groups:
+        if group_name in _HIGH_RISK_GROUPS:
             base_score = 15
-        elif group_name in medium_risk_groups:
+        elif group_name in _MEDIUM_RISK_GROUPS:
             base_score = 10
         else:
             base_score = 5
@@ -343,11 +440,9 @@ class UploadService:
     
     def _determine_group_severity(self, group_name: str, member_count: int) -> str:
         """Determine severity based on group type and member count."""
-        high_risk_groups = ['Domain Admins', 'Enterprise Admins', 'Schema Admins']
-        
-        if group_name in high_risk_groups and member_count > 5:
+        if group_name in _HIGH_RISK_GROUPS and member_count > 5:
             return "high"
-        elif group_name in high_risk_groups or member_count > 10:
+        elif group_name in _HIGH_RISK_GROUPS or member_count > 10:
             return "medium"
         else:
             return "low"
@@ -356,3 +451,8 @@ class UploadService:
 def get_upload_service(storage: PostgresReportStorage) -> UploadService:
     """Factory function to get an UploadService instance."""
     return UploadService(storage)
+
+
+def request_view_refresh() -> None:
+    """Request a debounced materialized view refresh from outside the upload service."""
+    UploadService._request_refresh()
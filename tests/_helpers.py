@@ -0,0 +1,32 @@
+"""
+Shared Test Helpers
+Fixture utilities used by more than one test module
+"""
+
+import json
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from server.parsers.domain_analysis_parser import DomainAnalysisParser
+
+try:
+    import orjson
+except ImportError:  # Fall back to stdlib json if orjson is not installed
+    orjson = None
+
+
+def encode_json(data):
+    """Serialize a fixture mapping (dict or MappingProxyType) to JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(dict(data))
+    return json.dumps(dict(data)).encode()
+
+
+# The parser holds no per-report state, so one instance serves every test.
+# Server modules are imported on first use so collecting tests stays cheap.
+@lru_cache(maxsize=None)
+def get_parser() -> "DomainAnalysisParser":
+    """Return the process-wide DomainAnalysisParser shared by the parser tests."""
+    from server.parsers.domain_analysis_parser import DomainAnalysisParser
+    return DomainAnalysisParser()
@@ -4,126 +4,128 @@ Tests that PingCastle and domain scanner data don't interfere with each other
 """
 
 import unittest
-import json
-import tempfile
-from pathlib import Path
+from collections import defaultdict
 from datetime import datetime
-from unittest.mock import Mock
+from operator import itemgetter
+from types import MappingProxyType
 
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
 
-from server.parsers.domain_analysis_parser import DomainAnalysisParser
-from server.models import SecurityToolType
+from _helpers import encode_json, get_parser
+
+
+# Tool types allowed to carry PingCastle domain metadata
+_PINGCASTLE_TYPES = frozenset({'pingcastle'})
+
+# Sort key for mock reports prepared by _with_report_dates()
+_BY_REPORT_DATE = itemgetter('_ts')
+
+
+def _with_report_dates(reports):
+    """Parse each mock report's ISO date once into an integer epoch for latest-report lookups."""
+    for r in reports:
+        r['_ts'] = int(datetime.fromisoformat(r['report_date'].replace('Z', '+00:00')).timestamp())
+    return reports
+
+
+# Sample domain scanner JSON (should NOT set PingCastle metadata)
+_DOMAIN_SCANNER_DATA = MappingProxyType({
+    "tool_type": "domain_group_members",
+    "domain": "test.local",
+    "domain_sid": "S-1-5-21-1234567890-1234567890-1234567890",
+    "report_date": "2024-01-15T10:30:00.000Z",
+    "groups": {
+        "Domain Admins": [
+            {
+                "name": "Administrator",
+                "samaccountname": "Administrator",
+                "sid": "S-1-5-21-1234567890-1234567890-1234567890-500",
+                "type": "user",
+                "enabled": True
+            }
+        ]
+    },
+    "metadata": {
+        "agent_name": "powershell_domain_scanner_minimal",
+        "script_version": "1.0"
+    }
+})
+
+# Mock PingCastle data (should have all domain metadata)
+_PINGCASTLE_DATA = MappingProxyType({
+    "domain": "test.local",
+    "domain_sid": "S-1-5-21-1234567890-1234567890-1234567890",
+    "domain_functional_level": "2016",
+    "forest_functional_level": "2016", 
+    "maturity_level": "Level 3",
+    "dc_count": 2,
+    "user_count": 1500,
+    "computer_count": 800,
+    "global_score": 75,
+    "stale_objects_score": 20,
+    "privileged_accounts_score": 25,
+    "trusts_score": 15,
+    "anomalies_score": 15
+})
 
 
 class TestDataSeparationBugFix(unittest.TestCase):
     """Test that the data separation bug has been properly fixed."""
     
-    def setUp(self):
-        """Set up test fixtures."""
-        self.domain_parser = DomainAnalysisParser()
+    @classmethod
+    def setUpClass(cls):
+        """Set up test fixtures, parsing the domain scanner report once."""
+        cls.domain_parser = get_parser()
         
-        # Sample domain scanner JSON (should NOT set PingCastle metadata)
-        self.domain_scanner_data = {
-            "tool_type": "domain_group_members",
-            "domain": "test.local",
-            "domain_sid": "S-1-5-21-1234567890-1234567890-1234567890",
-            "report_date": "2024-01-15T10:30:00.000Z",
-            "groups": {
-                "Domain Admins": [
-                    {
-                        "name": "Administrator",
-                        "samaccountname": "Administrator",
-                        "sid": "S-1-5-21-1234567890-1234567890-1234567890-500",
-                        "type": "user",
-                        "enabled": True
-                    }
-                ]
-            },
-            "metadata": {
-                "agent_name": "powershell_domain_scanner_minimal",
-                "script_version": "1.0"
-            }
-        }
+        cls.domain_scanner_data = _DOMAIN_SCANNER_DATA
+        cls.pingcastle_data = _PINGCASTLE_DATA
         
-        # Mock PingCastle data (should have all domain metadata)
-        self.pingcastle_data = {
-            "domain": "test.local",
-            "domain_sid": "S-1-5-21-1234567890-1234567890-1234567890",
-            "domain_functional_level": "2016",
-            "forest_functional_level": "2016", 
-            "maturity_level": "Level 3",
-            "dc_count": 2,
-            "user_count": 1500,
-            "computer_count": 800,
-            "global_score": 75,
-            "stale_objects_score": 20,
-            "privileged_accounts_score": 25,
-            "trusts_score": 15,
-            "anomalies_score": 15
-        }
+        cls._cached_domain_scanner_report = cls.domain_parser.parse_bytes(encode_json(cls.domain_scanner_data))
     
     def test_domain_scanner_doesnt_set_pingcastle_metadata(self):
         """Test that domain scanner reports don't set PingCastle-specific metadata."""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            json.dump(self.domain_scanner_data, f)
-            temp_path = Path(f.name)
+        report = self._cached_domain_scanner_report
         
-        try:
-            # Parse domain scanner report
-            report = self.domain_parser.parse_report(temp_path)
-            
-            # ✅ Should have domain and domain_sid for validation
-            self.assertEqual(report.domain, "test.local")
-            self.assertEqual(report.domain_sid, "S-1-5-21-1234567890-1234567890-1234567890")
-            
-            # ✅ Should NOT have PingCastle-specific metadata
-            self.assertIsNone(report.domain_functional_level)
-            self.assertIsNone(report.forest_functional_level)
-            self.assertIsNone(report.maturity_level)
-            self.assertIsNone(report.dc_count)
-            self.assertIsNone(report.user_count)
-            self.assertIsNone(report.computer_count)
-            
-            # ✅ Should NOT have PingCastle scores
-            self.assertIsNone(report.global_score)
-            self.assertIsNone(report.stale_objects_score)
-            self.assertIsNone(report.privileged_accounts_score)
-            self.assertIsNone(report.trusts_score)
-            self.assertIsNone(report.anomalies_score)
-            
-            # ✅ Should have group membership findings
-            self.assertGreater(len(report.findings), 0)
-            domain_admins_finding = next(f for f in report.findings if f.metadata.get('group_name') == 'Domain Admins')
-            self.assertEqual(domain_admins_finding.category, "DonScanner")
-            
-        finally:
-            temp_path.unlink()
+        # ✅ Should have domain and domain_sid for validation
+        self.assertEqual(report.domain, "test.local")
+        self.assertEqual(report.domain_sid, "S-1-5-21-1234567890-1234567890-1234567890")
+        
+        # ✅ Should NOT have PingCastle-specific metadata
+        self.assertIsNone(report.domain_functional_level)
+        self.assertIsNone(report.forest_functional_level)
+        self.assertIsNone(report.maturity_level)
+        self.assertIsNone(report.dc_count)
+        self.assertIsNone(report.user_count)
+        self.assertIsNone(report.computer_count)
+        
+        # ✅ Should NOT have PingCastle scores
+        self.assertIsNone(report.global_score)
+        self.assertIsNone(report.stale_objects_score)
+        self.assertIsNone(report.privileged_accounts_score)
+        self.assertIsNone(report.trusts_score)
+        self.assertIsNone(report.anomalies_score)
+        
+        # ✅ Should have group membership findings
+        self.assertGreater(len(report.findings), 0)
+        findings_by_group = {f.metadata.get('group_name'): f for f in report.findings}
+        self.assertEqual(findings_by_group['Domain Admins'].category, "DonScanner")
     
     def test_data_scope_indication(self):
         """Test that domain scanner reports clearly indicate their data scope."""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as f:
-            json.dump(self.domain_scanner_data, f)
-            temp_path = Path(f.name)
+        report = self._cached_domain_scanner_report
         
-        try:
-            report = self.domain_parser.parse_report(temp_path)
-            
-            # Should clearly indicate data scope
-            self.assertEqual(report.metadata.get('tool_type'), 'domain_group_members')
-            self.assertEqual(report.metadata.get('data_scope'), 'group_memberships_only')
-            
-        finally:
-            temp_path.unlink()
+        # Should clearly indicate data scope
+        self.assertEqual(report.metadata.get('tool_type'), 'domain_group_members')
+        self.assertEqual(report.metadata.get('data_scope'), 'group_memberships_only')
     
     def test_frontend_data_loading_logic(self):
         """Test the frontend data loading logic for proper separation."""
         # This tests the conceptual logic that should be in the frontend
         
         # Mock reports data
-        mock_all_reports = [
+        mock_all_reports = _with_report_dates([
             {
                 'id': 'pingcastle-1',
                 'tool_type': 'pingcastle',
@@ -142,15 +144,17 @@ class TestDataSeparationBugFix(unittest.TestCase):
                 'domain_functional_level': None,  # Fixed: No longer sets PingCastle metadata
                 'user_count': None     # Fixed: No longer sets PingCastle metadata
             }
-        ]
+        ])
         
-        # Simulate frontend logic - get latest by tool type
-        pingcastle_reports = [r for r in mock_all_reports if r['tool_type'] == 'pingcastle']
-        domain_scanner_reports = [r for r in mock_all_reports if r['tool_type'] == 'domain_analysis']
+        # Simulate frontend logic - group once by tool type, then take the latest of each
+        by_tool = defaultdict(list)
+        for r in mock_all_reports:
+            by_tool[r['tool_type']].append(r)
+        latest_by_tool = {tool: max(reports, key=_BY_REPORT_DATE) for tool, reports in by_tool.items()}
         
         # Should use PingCastle data for domain overview
-        if pingcastle_reports:
-            latest_pingcastle = max(pingcastle_reports, key=lambda r: r['report_date'])
+        if 'pingcastle' in latest_by_tool:
+            latest_pingcastle = latest_by_tool['pingcastle']
             
             # Domain overview should use PingCastle data
             domain_functional_level = latest_pingcastle['domain_functional_level']
@@ -162,8 +166,8 @@ class TestDataSeparationBugFix(unittest.TestCase):
             self.assertEqual(pingcastle_score, 75)
         
         # Should use domain scanner data for group management
-        if domain_scanner_reports:
-            latest_domain_scanner = max(domain_scanner_reports, key=lambda r: r['report_date'])
+        if 'domain_analysis' in latest_by_tool:
+            latest_domain_scanner = latest_by_tool['domain_analysis']
             
             # Domain scanner should not have PingCastle metadata
             self.assertIsNone(latest_domain_scanner['global_score'])
@@ -180,17 +184,24 @@ class TestDataSeparationBugFix(unittest.TestCase):
             {'tool_type': 'pingcastle', 'domain': 'other.local', 'global_score': 60}
         ]
         
+        # Group by tool type and by (tool type, domain) in a single pass
+        by_tool = defaultdict(list)
+        by_tool_domain = defaultdict(list)
+        for r in mixed_reports:
+            by_tool[r['tool_type']].append(r)
+            by_tool_domain[r['tool_type'], r['domain']].append(r)
+        
         # Filter for PingCastle reports only
-        pingcastle_only = [r for r in mixed_reports if r['tool_type'] == 'pingcastle']
+        pingcastle_only = by_tool['pingcastle']
         self.assertEqual(len(pingcastle_only), 2)
         
         # Filter for specific domain
-        test_domain_pingcastle = [r for r in pingcastle_only if r['domain'] == 'test.local']
+        test_domain_pingcastle = by_tool_domain['pingcastle', 'test.local']
         self.assertEqual(len(test_domain_pingcastle), 1)
         self.assertEqual(test_domain_pingcastle[0]['global_score'], 80)
         
         # Domain scanner reports should not have global scores
-        domain_scanner_only = [r for r in mixed_reports if r['tool_type'] == 'domain_analysis']
+        domain_scanner_only = by_tool['domain_analysis']
         self.assertEqual(len(domain_scanner_only), 1)
         self.assertIsNone(domain_scanner_only[0]['global_score'])
 
@@ -228,18 +239,23 @@ class TestBugFixValidation(unittest.TestCase):
         }
         
         # Step 3: Frontend data loading simulation
-        all_reports = [pingcastle_report, domain_scanner_report]
+        all_reports = _with_report_dates([pingcastle_report, domain_scanner_report])
         
         # Get latest domain (should be test.local from either report)
-        latest_domain = max(all_reports, key=lambda r: r['report_date'])['domain']
+        latest_domain = max(all_reports, key=_BY_REPORT_DATE)['domain']
         self.assertEqual(latest_domain, 'test.local')
         
-        # Get PingCastle data for domain overview (FIXED LOGIC)
-        pingcastle_reports = [r for r in all_reports if r['tool_type'] == 'pingcastle']
-        domain_pingcastle = [r for r in pingcastle_reports if r['domain'] == latest_domain]
+        # Group reports for the latest domain by tool type in one pass
+        domain_by_tool = defaultdict(list)
+        for r in all_reports:
+            if r['domain'] == latest_domain:
+                domain_by_tool[r['tool_type']].append(r)
         
-        if domain_pingcastle:
-            latest_pingcastle = max(domain_pingcastle, key=lambda r: r['report_date'])
+        latest_by_tool = {tool: max(reports, key=_BY_REPORT_DATE) for tool, reports in domain_by_tool.items()}
+        
+        # Get PingCastle data for domain overview (FIXED LOGIC)
+        if 'pingcastle' in latest_by_tool:
+            latest_pingcastle = latest_by_tool['pingcastle']
             
             # ✅ Domain overview should use PingCastle data
             self.assertEqual(latest_pingcastle['domain_functional_level'], '2016')
@@ -247,11 +263,8 @@ class TestBugFixValidation(unittest.TestCase):
             self.assertEqual(latest_pingcastle['global_score'], 75)
         
         # Get domain scanner data for group management
-        domain_scanner_reports = [r for r in all_reports if r['tool_type'] == 'domain_analysis']
-        domain_scanner = [r for r in domain_scanner_reports if r['domain'] == latest_domain]
-        
-        if domain_scanner:
-            latest_scanner = max(domain_scanner, key=lambda r: r['report_date'])
+        if 'domain_analysis' in latest_by_tool:
+            latest_scanner = latest_by_tool['domain_analysis']
             
             # ✅ Domain scanner should not have PingCastle metadata
             self.assertIsNone(latest_scanner['domain_functional_level'])
@@ -285,16 +298,19 @@ class TestBugFixValidation(unittest.TestCase):
             }
         }
         
-        # Validate each section has correct data source assignment
+        # Validate each section has correct data source assignment, grouping
+        # sections by source in the same pass
+        sections_by_source = defaultdict(list)
         for section, config in dashboard_sections.items():
             self.assertIn('data_source', config)
             self.assertIn('fields', config)
             self.assertIn('should_not_use', config)
+            sections_by_source[config['data_source']].append(section)
         
         # Specific validations
-        self.assertEqual(dashboard_sections['domain_overview']['data_source'], 'pingcastle_only')
-        self.assertEqual(dashboard_sections['domain_scanner_groups']['data_source'], 'domain_scanner_only')
-        self.assertEqual(dashboard_sections['global_risk_score']['data_source'], 'risk_api_combined')
+        self.assertIn('domain_overview', sections_by_source['pingcastle_only'])
+        self.assertEqual(sections_by_source['domain_scanner_only'], ['domain_scanner_groups'])
+        self.assertEqual(sections_by_source['risk_api_combined'], ['global_risk_score'])
 
 
 class TestPreventionMeasures(unittest.TestCase):
@@ -310,7 +326,7 @@ class TestPreventionMeasures(unittest.TestCase):
         ]
         
         for report in test_reports:
-            if report['tool_type'] == 'pingcastle':
+            if report['tool_type'] in _PINGCASTLE_TYPES:
                 # Only PingCastle should have domain metadata
                 self.assertTrue(report['has_domain_metadata'])
             else:
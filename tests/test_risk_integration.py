@@ -4,9 +4,8 @@ Tests risk calculation algorithms, API integration, and score accuracy
 """
 
 import unittest
-import json
-from datetime import datetime, timedelta
-from unittest.mock import Mock, patch, MagicMock
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
 
 # Import modules to test
 import sys
@@ -23,40 +22,45 @@ from server.risk_calculator import (
 )
 
 
+# Sample group data shared by the risk calculator tests
+_SAMPLE_GROUPS = (
+    {
+        'group_name': 'Domain Admins',
+        'total_members': 5,
+        'accepted_members': 2,
+        'unaccepted_members': 3
+    },
+    {
+        'group_name': 'Enterprise Admins', 
+        'total_members': 2,
+        'accepted_members': 2,
+        'unaccepted_members': 0
+    },
+    {
+        'group_name': 'Administrators',
+        'total_members': 10,
+        'accepted_members': 8,
+        'unaccepted_members': 2
+    },
+    {
+        'group_name': 'Print Operators',
+        'total_members': 5,
+        'accepted_members': 5,
+        'unaccepted_members': 0
+    }
+)
+
+
 class TestRiskCalculator(unittest.TestCase):
     """Test cases for the risk calculation engine."""
     
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         """Set up test fixtures."""
-        self.calculator = RiskCalculator()
-        
-        # Sample group data for testing
-        self.sample_groups = [
-            {
-                'group_name': 'Domain Admins',
-                'total_members': 5,
-                'accepted_members': 2,
-                'unaccepted_members': 3
-            },
-            {
-                'group_name': 'Enterprise Admins', 
-                'total_members': 2,
-                'accepted_members': 2,
-                'unaccepted_members': 0
-            },
-            {
-                'group_name': 'Administrators',
-                'total_members': 10,
-                'accepted_members': 8,
-                'unaccepted_members': 2
-            },
-            {
-                'group_name': 'Print Operators',
-                'total_members': 5,
-                'accepted_members': 5,
-                'unaccepted_members': 0
-            }
-        ]
+        cls.calculator = RiskCalculator()
+        cls.sample_groups = _SAMPLE_GROUPS
+        # Risks are immutable, so the score tests can share one calculation
+        cls.group_risks = tuple(cls.calculator.calculate_group_risks_batch(_SAMPLE_GROUPS))
     
     def test_group_risk_calculation_critical_group(self):
         """Test risk calculation for critical groups (Domain Admins)."""
@@ -115,6 +119,19 @@ class TestRiskCalculator(unittest.TestCase):
         self.assertGreater(risk.risk_score, 0)
         self.assertLess(risk.risk_score, 100)
     
+    def test_group_risks_batch_matches_single_calculation(self):
+        """Test that batch group risk calculation matches per-group calculation."""
+        batch = self.calculator.calculate_group_risks_batch(self.sample_groups)
+        
+        self.assertEqual(len(batch), len(self.sample_groups))
+        for group_data, risk in zip(self.sample_groups, batch):
+            expected = self.calculator.calculate_group_risk(
+                group_name=group_data['group_name'],
+                total_members=group_data['total_members'],
+                accepted_members=group_data['accepted_members']
+            )
+            self.assertEqual(risk, expected)
+    
     def test_domain_risk_assessment(self):
         """Test complete domain risk assessment calculation."""
         assessment = self.calculator.calculate_domain_risk(
@@ -146,6 +163,44 @@ class TestRiskCalculator(unittest.TestCase):
         self.assertIn('critical_groups', assessment.calculation_metadata)
         self.assertIn('total_members', assessment.calculation_metadata)
     
+    def test_domain_risk_reuses_scores_for_unchanged_groups(self):
+        """Test that re-scoring identical group data reuses the memoized group risks."""
+        calculator = RiskCalculator()
+        
+        first = calculator.calculate_domain_risk('test.local', self.sample_groups)
+        second = calculator.calculate_domain_risk('other.local', list(self.sample_groups))
+        
+        self.assertIs(first.group_risks[0], second.group_risks[0])
+        self.assertEqual(first.domain_group_score, second.domain_group_score)
+        self.assertEqual(second.domain, 'other.local')
+        self.assertIsNot(first.calculation_metadata, second.calculation_metadata)
+        
+        # Changed membership data is scored afresh
+        changed_groups = [dict(self.sample_groups[0], accepted_members=5)] + list(self.sample_groups[1:])
+        changed = calculator.calculate_domain_risk('test.local', changed_groups)
+        self.assertLess(changed.domain_group_score, first.domain_group_score)
+    
+    def test_domain_risk_cache_survives_new_services(self):
+        """Test that scores memoized by one risk service are reused by the next one."""
+        from server.risk_service import get_risk_service
+        
+        # Counts no other test uses, so the first call below is a cache miss
+        group_data = [
+            {'group_name': 'Domain Admins', 'total_members': 97, 'accepted_members': 13},
+            {'group_name': 'Print Operators', 'total_members': 89, 'accepted_members': 11},
+        ]
+        first_service = get_risk_service(None)
+        second_service = get_risk_service(None)
+        self.assertIsNot(first_service.risk_calculator, second_service.risk_calculator)
+        
+        with patch.object(RiskCalculator, 'calculate_group_risks_batch', autospec=True,
+                          side_effect=RiskCalculator.calculate_group_risks_batch) as batch:
+            first = first_service.risk_calculator.calculate_domain_risk('test.local', group_data)
+            second = second_service.risk_calculator.calculate_domain_risk('test.local', group_data)
+        
+        self.assertEqual(batch.call_count, 1)
+        self.assertEqual(first.domain_group_score, second.domain_group_score)
+    
     def test_global_risk_calculation_with_pingcastle(self):
         """Test global risk calculation with both PingCastle and domain group scores."""
         global_risk = self.calculator.calculate_global_risk(
@@ -190,6 +245,25 @@ class TestRiskCalculator(unittest.TestCase):
         self.assertIsNone(global_risk.pingcastle_contribution)
         self.assertEqual(global_risk.domain_group_contribution, 100.0)
     
+    def test_global_risk_batch_matches_single_calculation(self):
+        """Test that batch global risk calculation matches per-domain calculation."""
+        rows = [
+            ('a.local', 80.0, 60.0, None),
+            ('b.local', None, 45.0, 70.0),
+            ('c.local', 0.0, 0.0, None)
+        ]
+        
+        batch = self.calculator.calculate_global_risk_batch(rows)
+        
+        self.assertEqual([r.domain for r in batch], ['a.local', 'b.local', 'c.local'])
+        self.assertEqual(len({r.assessment_date for r in batch}), 1)
+        for row, global_risk in zip(rows, batch):
+            expected = self.calculator.calculate_global_risk(row[0], row[1], row[2], hoxhunt_score=row[3])
+            self.assertEqual(global_risk.global_score, expected.global_score)
+            self.assertEqual(global_risk.pingcastle_contribution, expected.pingcastle_contribution)
+            self.assertEqual(global_risk.domain_group_contribution, expected.domain_group_contribution)
+            self.assertEqual(global_risk.hoxhunt_contribution, expected.hoxhunt_contribution)
+    
     def test_risk_trend_calculation(self):
         """Test risk trend calculation from historical data."""
         # Mock historical data
@@ -228,15 +302,7 @@ class TestRiskCalculator(unittest.TestCase):
     
     def test_access_governance_score_calculation(self):
         """Test access governance score calculation."""
-        # Create mock group risks
-        group_risks = []
-        for group_data in self.sample_groups:
-            risk = self.calculator.calculate_group_risk(
-                group_name=group_data['group_name'],
-                total_members=group_data['total_members'],
-                accepted_members=group_data['accepted_members']
-            )
-            group_risks.append(risk)
+        group_risks = self.group_risks
         
         access_score = self.calculator._calculate_access_governance_score(group_risks)
         
@@ -249,14 +315,7 @@ class TestRiskCalculator(unittest.TestCase):
     
     def test_privilege_escalation_score_calculation(self):
         """Test privilege escalation score calculation."""
-        group_risks = []
-        for group_data in self.sample_groups:
-            risk = self.calculator.calculate_group_risk(
-                group_name=group_data['group_name'],
-                total_members=group_data['total_members'],
-                accepted_members=group_data['accepted_members']
-            )
-            group_risks.append(risk)
+        group_risks = self.group_risks
         
         escalation_score = self.calculator._calculate_privilege_escalation_score(group_risks)
         
@@ -269,14 +328,7 @@ class TestRiskCalculator(unittest.TestCase):
     
     def test_compliance_posture_score_calculation(self):
         """Test compliance posture score calculation."""
-        group_risks = []
-        for group_data in self.sample_groups:
-            risk = self.calculator.calculate_group_risk(
-                group_name=group_data['group_name'],
-                total_members=group_data['total_members'],
-                accepted_members=group_data['accepted_members']
-            )
-            group_risks.append(risk)
+        group_risks = self.group_risks
         
         compliance_score = self.calculator._calculate_compliance_posture_score(group_risks)
         
@@ -286,14 +338,7 @@ class TestRiskCalculator(unittest.TestCase):
     
     def test_operational_risk_score_calculation(self):
         """Test operational risk score calculation."""
-        group_risks = []
-        for group_data in self.sample_groups:
-            risk = self.calculator.calculate_group_risk(
-                group_name=group_data['group_name'],
-                total_members=group_data['total_members'],
-                accepted_members=group_data['accepted_members']
-            )
-            group_risks.append(risk)
+        group_risks = self.group_risks
         
         operational_score = self.calculator._calculate_operational_risk_score(group_risks)
         
@@ -305,9 +350,16 @@ class TestRiskCalculator(unittest.TestCase):
 class TestRiskIntegration(unittest.TestCase):
     """Test cases for risk integration with existing systems."""
     
+    @classmethod
+    def setUpClass(cls):
+        cls.calculator = RiskCalculator()
+        cls.sample_groups = _SAMPLE_GROUPS
+        # Risks are immutable, so the score tests can share one calculation
+        cls.group_risks = tuple(cls.calculator.calculate_group_risks_batch(_SAMPLE_GROUPS))
+    
     def test_pingcastle_score_preservation(self):
         """Test that PingCastle scores are not modified by domain group integration."""
-        calculator = RiskCalculator()
+        calculator = self.calculator
         
         # Original PingCastle score
         original_pingcastle = 85.0
@@ -328,7 +380,7 @@ class TestRiskIntegration(unittest.TestCase):
     
     def test_risk_score_weighting(self):
         """Test that risk score weighting follows the specified formula."""
-        calculator = RiskCalculator()
+        calculator = self.calculator
         
         pingcastle_score = 80.0
         domain_group_score = 60.0
@@ -352,7 +404,7 @@ class TestRiskIntegration(unittest.TestCase):
     
     def test_risk_calculation_edge_cases(self):
         """Test risk calculation edge cases."""
-        calculator = RiskCalculator()
+        calculator = self.calculator
         
         # Test with zero scores
         global_risk_zero = calculator.calculate_global_risk(
@@ -381,7 +433,7 @@ class TestRiskIntegration(unittest.TestCase):
     
     def test_group_profile_configuration(self):
         """Test that group risk profiles are correctly configured."""
-        calculator = RiskCalculator()
+        calculator = self.calculator
         
         # Test critical group profile
         domain_admins_profile = calculator.GROUP_PROFILES['Domain Admins']
@@ -394,20 +446,15 @@ class TestRiskIntegration(unittest.TestCase):
         self.assertEqual(print_ops_profile.risk_level, GroupRiskLevel.LOW)
         self.assertEqual(print_ops_profile.base_weight, 1.0)
         self.assertGreaterEqual(print_ops_profile.max_acceptable_members, 5)
+        
+        # Integer ranks follow the risk level ordering
+        self.assertGreater(domain_admins_profile.rank, print_ops_profile.rank)
     
     def test_risk_category_calculations(self):
         """Test individual risk category calculations."""
-        calculator = RiskCalculator()
+        calculator = self.calculator
         
-        # Create sample group risks
-        group_risks = []
-        for group_data in self.sample_groups:
-            risk = calculator.calculate_group_risk(
-                group_name=group_data['group_name'],
-                total_members=group_data['total_members'],
-                accepted_members=group_data['accepted_members']
-            )
-            group_risks.append(risk)
+        group_risks = self.group_risks
         
         # Test each category calculation
         access_gov = calculator._calculate_access_governance_score(group_risks)
@@ -430,6 +477,9 @@ class TestRiskIntegrationAPI(unittest.TestCase):
     
     def test_risk_api_data_structure(self):
         """Test that API returns properly structured risk data."""
+        # One timestamp per response, shared by every row it contains
+        assessment_date = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        
         # Mock the expected API response structure
         expected_global_risk = {
             'domain': 'test.local',
@@ -440,7 +490,7 @@ class TestRiskIntegrationAPI(unittest.TestCase):
             'domain_group_contribution': 24.3,
             'trend_direction': 'stable',
             'trend_percentage': 2.1,
-            'assessment_date': datetime.utcnow().isoformat()
+            'assessment_date': assessment_date
         }
         
         # Validate structure
@@ -505,6 +555,11 @@ class TestRiskIntegrationAPI(unittest.TestCase):
 class TestRiskNonInterference(unittest.TestCase):
     """Test cases to ensure domain group risks don't interfere with PingCastle."""
     
+    @classmethod
+    def setUpClass(cls):
+        cls.calculator = RiskCalculator()
+        cls.sample_groups = _SAMPLE_GROUPS
+    
     def test_pingcastle_data_unchanged(self):
         """Test that PingCastle report data remains unchanged."""
         # This test would verify that existing PingCastle reports
@@ -528,7 +583,7 @@ class TestRiskNonInterference(unittest.TestCase):
     
     def test_separate_calculation_paths(self):
         """Test that PingCastle and domain group calculations are independent."""
-        calculator = RiskCalculator()
+        calculator = self.calculator
         
         # Calculate domain group risk independently
         domain_assessment = calculator.calculate_domain_risk('test.local', self.sample_groups)
@@ -544,7 +599,7 @@ class TestRiskNonInterference(unittest.TestCase):
     
     def test_graceful_degradation(self):
         """Test system works with missing PingCastle data."""
-        calculator = RiskCalculator()
+        calculator = self.calculator
         
         # Should work fine with no PingCastle data
         global_risk = calculator.calculate_global_risk(
@@ -9,57 +9,137 @@ These tests verify:
 - Global risk calculations are accurate
 """
 
+import importlib.resources
+import re
 import unittest
 from unittest.mock import Mock, MagicMock, patch
 from datetime import datetime, timedelta
 from decimal import Decimal
+from functools import lru_cache
+from types import MappingProxyType
 import json
 
 import sys
-import os
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'server'))
+from pathlib import Path
 
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+_SERVER_DIR = _REPO_ROOT / 'server'
+# Resolved through the import system so it also works from an installed/zipped package;
+# init_db.sql lives outside any package and is read straight from disk
+_RISK_SERVICE_PATH = importlib.resources.files('server') / 'risk_service.py'
+_INIT_DB_PATH = _REPO_ROOT / 'migrations' / 'init_db.sql'
+
+if str(_SERVER_DIR) not in sys.path:
+    sys.path.append(str(_SERVER_DIR))
+
+
+@lru_cache(maxsize=None)
+def _read_source(path):
+    """Read a source file or package resource once per test process, shared by every test class."""
+    return path.read_text(encoding='utf-8')
+
+
+def _scan_literals(content, literals):
+    """Return the subset of literals found in content, in a single pass."""
+    # Longest first so a literal never loses to one of its own prefixes
+    pattern = re.compile('|'.join(
+        re.escape(literal) for literal in sorted(literals, key=len, reverse=True)
+    ))
+    return frozenset(match.group() for match in pattern.finditer(content))
+
+
+_CREATE_TABLE_RE = re.compile(r'CREATE TABLE IF NOT EXISTS (\w+)')
+_CREATE_VIEW_RE = re.compile(r'CREATE OR REPLACE VIEW (\w+)')
+
+
+# Built once at import; tests that need to mutate a group should copy it with dict()
+_SAMPLE_GROUP_DATA = tuple(MappingProxyType(group) for group in [
+    {
+        'group_name': 'Domain Admins',
+        'total_members': 5,
+        'accepted_members': 3,
+        'unaccepted_members': 2,
+        'members': (
+            MappingProxyType({'name': 'Admin1', 'type': 'user', 'enabled': True}),
+            MappingProxyType({'name': 'Admin2', 'type': 'user', 'enabled': True}),
+            MappingProxyType({'name': 'Admin3', 'type': 'user', 'enabled': True}),
+            MappingProxyType({'name': 'Admin4', 'type': 'user', 'enabled': False}),
+            MappingProxyType({'name': 'Admin5', 'type': 'user', 'enabled': True}),
+        )
+    },
+    {
+        'group_name': 'Enterprise Admins',
+        'total_members': 2,
+        'accepted_members': 1,
+        'unaccepted_members': 1,
+        'members': (
+            MappingProxyType({'name': 'EntAdmin1', 'type': 'user', 'enabled': True}),
+            MappingProxyType({'name': 'EntAdmin2', 'type': 'user', 'enabled': True}),
+        )
+    },
+    {
+        'group_name': 'Backup Operators',
+        'total_members': 8,
+        'accepted_members': 8,
+        'unaccepted_members': 0,
+        'members': ()  # All accepted
+    }
+])
+
+
+# Fixed reference date: trend analysis only looks at ordering, not "now"
+_HISTORY_END = datetime(2024, 1, 8)
+_SAMPLE_HISTORICAL_SCORES = tuple(
+    (_HISTORY_END - timedelta(days=days_ago), score)
+    for days_ago, score in (
+        (7, 50.0), (6, 48.0), (5, 47.0), (4, 46.0), (3, 45.0), (2, 44.0), (1, 43.0)
+    )
+)
 
 class TestRiskServiceSQLSyntax(unittest.TestCase):
     """Test that SQL queries have correct PostgreSQL syntax."""
     
+    @classmethod
+    def setUpClass(cls):
+        """Read risk_service.py once for all syntax assertions."""
+        cls.risk_service_src = _read_source(_RISK_SERVICE_PATH)
+        
+        cls.risk_service_tokens = _scan_literals(cls.risk_service_src, (
+            'INTERVAL :days DAY',
+            'INTERVAL :hours HOUR',
+            'make_interval(days => :days)',
+            'make_interval(hours => :hours)',
+            'text("""',
+            ':domain',
+            'f"""SELECT',
+        ))
+    
     def test_interval_syntax_uses_make_interval(self):
         """Verify INTERVAL syntax uses make_interval() function."""
-        # Read the risk_service.py file and check for proper syntax
-        risk_service_path = os.path.join(
-            os.path.dirname(__file__), '..', 'server', 'risk_service.py'
-        )
-        
-        with open(risk_service_path, 'r') as f:
-            content = f.read()
+        tokens = self.risk_service_tokens
         
         # Should NOT contain old broken syntax
-        self.assertNotIn('INTERVAL :days DAY', content, 
+        self.assertNotIn('INTERVAL :days DAY', tokens, 
             "Found broken INTERVAL syntax - should use make_interval()")
-        self.assertNotIn('INTERVAL :hours HOUR', content,
+        self.assertNotIn('INTERVAL :hours HOUR', tokens,
             "Found broken INTERVAL syntax - should use make_interval()")
         
         # Should contain correct syntax
-        self.assertIn('make_interval(days => :days)', content,
+        self.assertIn('make_interval(days => :days)', tokens,
             "Missing correct make_interval(days) syntax")
-        self.assertIn('make_interval(hours => :hours)', content,
+        self.assertIn('make_interval(hours => :hours)', tokens,
             "Missing correct make_interval(hours) syntax")
     
     def test_sql_queries_are_parameterized(self):
         """Verify SQL queries use parameterized queries (no SQL injection)."""
-        risk_service_path = os.path.join(
-            os.path.dirname(__file__), '..', 'server', 'risk_service.py'
-        )
-        
-        with open(risk_service_path, 'r') as f:
-            content = f.read()
+        tokens = self.risk_service_tokens
         
         # Should use SQLAlchemy text() with parameters
-        self.assertIn('text("""', content, "Should use SQLAlchemy text()")
-        self.assertIn(':domain', content, "Should use parameterized :domain")
+        self.assertIn('text("""', tokens, "Should use SQLAlchemy text()")
+        self.assertIn(':domain', tokens, "Should use parameterized :domain")
         
         # Should NOT have string formatting in SQL
-        self.assertNotIn('f"""SELECT', content, 
+        self.assertNotIn('f"""SELECT', tokens, 
             "Should not use f-strings for SQL queries")
 
 
@@ -68,39 +148,8 @@ class TestRiskCalculationFixtures(unittest.TestCase):
     
     @classmethod
     def get_sample_group_data(cls):
-        """Get sample group data for testing."""
-        return [
-            {
-                'group_name': 'Domain Admins',
-                'total_members': 5,
-                'accepted_members': 3,
-                'unaccepted_members': 2,
-                'members': [
-                    {'name': 'Admin1', 'type': 'user', 'enabled': True},
-                    {'name': 'Admin2', 'type': 'user', 'enabled': True},
-                    {'name': 'Admin3', 'type': 'user', 'enabled': True},
-                    {'name': 'Admin4', 'type': 'user', 'enabled': False},
-                    {'name': 'Admin5', 'type': 'user', 'enabled': True},
-                ]
-            },
-            {
-                'group_name': 'Enterprise Admins',
-                'total_members': 2,
-                'accepted_members': 1,
-                'unaccepted_members': 1,
-                'members': [
-                    {'name': 'EntAdmin1', 'type': 'user', 'enabled': True},
-                    {'name': 'EntAdmin2', 'type': 'user', 'enabled': True},
-                ]
-            },
-            {
-                'group_name': 'Backup Operators',
-                'total_members': 8,
-                'accepted_members': 8,
-                'unaccepted_members': 0,
-                'members': []  # All accepted
-            }
-        ]
+        """Get sample group data for testing (shared and read-only)."""
+        return _SAMPLE_GROUP_DATA
     
     @classmethod
     def get_sample_pingcastle_score(cls):
@@ -110,16 +159,7 @@ class TestRiskCalculationFixtures(unittest.TestCase):
     @classmethod
     def get_sample_historical_scores(cls):
         """Get sample historical scores for trend analysis."""
-        now = datetime.utcnow()
-        return [
-            (now - timedelta(days=7), 50.0),
-            (now - timedelta(days=6), 48.0),
-            (now - timedelta(days=5), 47.0),
-            (now - timedelta(days=4), 46.0),
-            (now - timedelta(days=3), 45.0),
-            (now - timedelta(days=2), 44.0),
-            (now - timedelta(days=1), 43.0),
-        ]
+        return _SAMPLE_HISTORICAL_SCORES
     
     def test_sample_data_is_valid(self):
         """Verify sample data fixtures are properly structured."""
@@ -127,70 +167,86 @@ class TestRiskCalculationFixtures(unittest.TestCase):
         
         self.assertEqual(len(group_data), 3)
         
-        for group in group_data:
-            self.assertIn('group_name', group)
-            self.assertIn('total_members', group)
-            self.assertIn('accepted_members', group)
-            self.assertIn('unaccepted_members', group)
-            
-            # Verify math adds up
-            self.assertEqual(
-                group['total_members'],
-                group['accepted_members'] + group['unaccepted_members']
-            )
+        required_keys = {'group_name', 'total_members', 'accepted_members', 'unaccepted_members'}
+        
+        # Collect every offending group in one pass, then assert once
+        missing_keys = [
+            group.get('group_name') for group in group_data
+            if not required_keys <= group.keys()
+        ]
+        self.assertEqual(missing_keys, [], "Groups missing required keys")
+        
+        # Verify math adds up
+        unbalanced = [
+            group['group_name'] for group in group_data
+            if group['total_members'] != group['accepted_members'] + group['unaccepted_members']
+        ]
+        self.assertEqual(unbalanced, [], "Groups whose member counts don't add up")
 
 
 class TestRiskCalculatorIntegration(unittest.TestCase):
-    """Integration tests for RiskCalculator class."""
+    """Integration tests for RiskCalculator class.
     
-    def setUp(self):
-        """Set up test fixtures."""
+    RiskCalculator is pure computation - it loads no configuration and opens
+    no database connection - so these run without any storage to mock out.
+    """
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up test fixtures once; the calculator holds no per-test state."""
         try:
             from server.risk_calculator import RiskCalculator, GroupRiskLevel
-            self.calculator = RiskCalculator()
-            self.GroupRiskLevel = GroupRiskLevel
         except ImportError as e:
-            self.skipTest(f"Cannot import risk_calculator: {e}")
+            raise unittest.SkipTest(f"Cannot import risk_calculator: {e}")
+        cls.calculator = RiskCalculator()
+        cls.GroupRiskLevel = GroupRiskLevel
     
-    def test_calculate_group_risk_domain_admins(self):
-        """Test risk calculation for Domain Admins group."""
-        risk = self.calculator.calculate_group_risk(
-            group_name='Domain Admins',
-            total_members=5,
-            accepted_members=3
+    def test_calculate_group_risk(self):
+        """Test risk calculation for critical, fully accepted and empty groups."""
+        # (group_name, total, accepted, expected risk level, expect a positive score)
+        cases = (
+            # Elevated risk due to unaccepted members in critical group
+            ('Domain Admins', 5, 3, self.GroupRiskLevel.CRITICAL, True),
+            # All members accepted - should have low/zero risk
+            ('Backup Operators', 8, 8, None, False),
+            ('Empty Group', 0, 0, None, False),
         )
         
-        self.assertEqual(risk.group_name, 'Domain Admins')
-        self.assertEqual(risk.total_members, 5)
-        self.assertEqual(risk.accepted_members, 3)
-        self.assertEqual(risk.unaccepted_members, 2)
-        self.assertEqual(risk.risk_level, self.GroupRiskLevel.CRITICAL)
-        
-        # Should have elevated risk due to unaccepted members in critical group
-        self.assertGreater(risk.risk_score, 0)
+        for group_name, total, accepted, risk_level, expect_score in cases:
+            with self.subTest(group_name=group_name):
+                risk = self.calculator.calculate_group_risk(
+                    group_name=group_name,
+                    total_members=total,
+                    accepted_members=accepted
+                )
+                
+                self.assertEqual(risk.group_name, group_name)
+                self.assertEqual(risk.total_members, total)
+                self.assertEqual(risk.accepted_members, accepted)
+                self.assertEqual(risk.unaccepted_members, total - accepted)
+                if risk_level is not None:
+                    self.assertEqual(risk.risk_level, risk_level)
+                
+                if expect_score:
+                    self.assertGreater(risk.risk_score, 0)
+                else:
+                    self.assertEqual(risk.risk_score, 0.0)
     
-    def test_calculate_group_risk_fully_accepted(self):
-        """Test risk calculation for fully accepted group."""
-        risk = self.calculator.calculate_group_risk(
-            group_name='Backup Operators',
-            total_members=8,
-            accepted_members=8
+    def test_calculate_group_risk_is_memoized(self):
+        """Identical group inputs reuse the cached risk result."""
+        first = self.calculator.calculate_group_risk('Domain Admins', 5, 3)
+        again = self.calculator.calculate_group_risk(
+            group_name='Domain Admins',
+            total_members=5,
+            accepted_members=3
         )
         
-        # All members accepted - should have low/zero risk
-        self.assertEqual(risk.unaccepted_members, 0)
-        self.assertEqual(risk.risk_score, 0.0)
-    
-    def test_calculate_group_risk_empty_group(self):
-        """Test risk calculation for empty group."""
-        risk = self.calculator.calculate_group_risk(
-            group_name='Empty Group',
-            total_members=0,
-            accepted_members=0
-        )
+        self.assertIs(first, again)
+        self.assertIsNot(first, self.calculator.calculate_group_risk('Domain Admins', 5, 4))
         
-        self.assertEqual(risk.total_members, 0)
-        self.assertEqual(risk.risk_score, 0.0)
+        # The shared result can't be changed under other callers
+        with self.assertRaises(TypeError):
+            first.contributing_factors['unaccepted_ratio'] = 0.0
     
     def test_calculate_domain_risk(self):
         """Test domain-level risk calculation."""
@@ -276,41 +332,34 @@ class TestRiskCalculatorIntegration(unittest.TestCase):
 class TestDatabaseSchemaIntegrity(unittest.TestCase):
     """Test that database schema matches expected structure."""
     
+    # Required tables
+    required_tables = (
+        'domain_risk_assessments',
+        'group_risk_assessments',
+        'global_risk_scores',
+        'risk_configuration',
+        'risk_calculation_history',
+    )
+    
+    @classmethod
+    def setUpClass(cls):
+        """Read init_db.sql once for all schema assertions."""
+        cls.init_db_sql = _read_source(_INIT_DB_PATH)
+        
+        cls.created_tables = frozenset(_CREATE_TABLE_RE.findall(cls.init_db_sql))
+        cls.created_views = frozenset(_CREATE_VIEW_RE.findall(cls.init_db_sql))
+    
     def test_init_db_contains_risk_tables(self):
         """Verify init_db.sql contains all required risk tables."""
-        init_db_path = os.path.join(
-            os.path.dirname(__file__), '..', 'migrations', 'init_db.sql'
-        )
-        
-        with open(init_db_path, 'r') as f:
-            content = f.read()
-        
-        # Required tables
-        required_tables = [
-            'domain_risk_assessments',
-            'group_risk_assessments',
-            'global_risk_scores',
-            'risk_configuration',
-            'risk_calculation_history'
-        ]
-        
-        for table in required_tables:
-            self.assertIn(f'CREATE TABLE IF NOT EXISTS {table}', content,
+        for table in self.required_tables:
+            self.assertIn(table, self.created_tables,
                 f"Missing table: {table}")
     
     def test_init_db_contains_risk_dashboard_view(self):
         """Verify init_db.sql contains risk_dashboard_summary view."""
-        init_db_path = os.path.join(
-            os.path.dirname(__file__), '..', 'migrations', 'init_db.sql'
-        )
-        
-        with open(init_db_path, 'r') as f:
-            content = f.read()
-        
-        self.assertIn('risk_dashboard_summary', content,
-            "Missing risk_dashboard_summary view")
-        self.assertIn('CREATE OR REPLACE VIEW', content,
-            "Should use CREATE OR REPLACE VIEW for views")
+        # Only views created with CREATE OR REPLACE VIEW are collected
+        self.assertIn('risk_dashboard_summary', self.created_views,
+            "Missing risk_dashboard_summary view (should use CREATE OR REPLACE VIEW)")
 
 
 class TestMigrationRunner(unittest.TestCase):
@@ -326,22 +375,34 @@ class TestMigrationRunner(unittest.TestCase):
         # Create mock engine
         mock_engine = Mock()
         
-        runner = MigrationRunner(mock_engine)
-        migrations = runner.discover_migrations()
+        # Serve an in-memory listing (deliberately out of order) instead of the disk
+        fake_dir = Path('migrations')
+        fake_listing = [
+            fake_dir / 'migration_005_add_risk_dashboard_summary.sql',
+            fake_dir / 'init_db.sql',
+            fake_dir / 'migration_001_rename_global_score.sql',
+            fake_dir / 'notes.sql',  # Not a migration - should be ignored
+        ]
+        
+        runner = MigrationRunner(mock_engine, migrations_dir=fake_dir)
+        with patch.object(Path, 'exists', return_value=True), \
+                patch.object(Path, 'glob', return_value=fake_listing):
+            migrations = runner.discover_migrations()
         
-        # Should find at least init_db.sql
-        filenames = [m.filename for m in migrations]
+        # Should find init_db.sql and the numbered migrations only
+        filenames = frozenset(m.filename for m in migrations)
         self.assertIn('init_db.sql', filenames)
+        self.assertNotIn('notes.sql', filenames)
+        self.assertEqual(len(migrations), 3)
         
         # Migrations should be ordered by version
-        versions = [m.version for m in migrations]
-        self.assertEqual(versions, sorted(versions))
+        versions = tuple(m.version for m in migrations)
+        self.assertTupleEqual(versions, tuple(sorted(versions)))
     
     def test_migration_parsing(self):
         """Test migration filename parsing."""
         try:
             from server.migration_runner import Migration
-            from pathlib import Path
         except ImportError as e:
             self.skipTest(f"Cannot import: {e}")
         
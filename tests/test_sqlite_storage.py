@@ -0,0 +1,171 @@
+"""
+SQLite Report Storage Tests
+Round-trip and schema-upgrade tests for the legacy SQLite ReportStorage
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from server.models import Finding, Report, SecurityToolType
+from server.storage import _SCHEMA_VERSION, ReportStorage
+
+
+def _make_report(report_id: str, day: int, score: int = 10) -> Report:
+    return Report(
+        id=report_id,
+        tool_type=SecurityToolType.PINGCASTLE,
+        domain="test.local",
+        report_date=datetime(2024, 1, day),
+        upload_date=datetime(2024, 1, day),
+        global_score=score,
+        stale_objects_score=day,
+        findings=[
+            Finding(
+                id=f"{report_id}-f1",
+                report_id=report_id,
+                tool_type=SecurityToolType.PINGCASTLE,
+                category="StaleObjects",
+                name="S-PwdNeverExpires",
+                score=score,
+                description="Password never expires",
+            ),
+        ],
+    )
+
+
+class TestSQLiteReportStorage(unittest.TestCase):
+    """Test the SQLite-backed ReportStorage."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "reports.db")
+        self.storage = ReportStorage(self.db_path)
+
+    def tearDown(self):
+        self.storage.close()
+        self.tmpdir.cleanup()
+
+    def test_report_round_trip(self):
+        """Saved reports come back with their scores, tool type and findings."""
+        self.storage.save_report(_make_report("r1", 1, score=42))
+
+        report = self.storage.get_report("r1")
+        self.assertEqual(report.global_score, 42)
+        self.assertEqual(report.tool_type, SecurityToolType.PINGCASTLE)
+        self.assertEqual([f.id for f in report.findings], ["r1-f1"])
+
+        summaries = self.storage.get_all_reports_summary()
+        self.assertEqual([s.id for s in summaries], ["r1"])
+
+    def test_summary_json_matches_models(self):
+        """The JSON fast path serializes the same fields as the model-based summary."""
+        self.storage.save_reports_bulk([_make_report("r1", 1), _make_report("r2", 2)])
+
+        expected = [json.loads(s.model_dump_json()) for s in self.storage.get_all_reports_summary()]
+        self.assertEqual(json.loads(self.storage.get_all_reports_summary_json()), expected)
+
+    def test_iter_all_reports_pages_without_holding_lock(self):
+        """Reports stream page by page and the storage stays usable mid-iteration."""
+        self.storage.save_reports_bulk([_make_report(f"r{day}", day) for day in (1, 2, 3)])
+
+        seen = []
+        with patch("server.storage._REPORT_PAGE_SIZE", 2):
+            for report in self.storage.iter_all_reports():
+                # Would deadlock if the iterator held the storage lock across yields
+                self.assertEqual(self.storage.get_report(report.id).id, report.id)
+                seen.append((report.id, [f.id for f in report.findings]))
+
+        self.assertEqual(seen, [("r1", ["r1-f1"]), ("r2", ["r2-f1"]), ("r3", ["r3-f1"])])
+
+    def test_missing_report_raises(self):
+        with self.assertRaises(ValueError):
+            self.storage.get_report("missing")
+
+    def test_bulk_save_and_recurring_findings(self):
+        """Recurring totals track bulk inserts and re-saved findings."""
+        self.storage.save_reports_bulk([_make_report("r1", 1, 10), _make_report("r2", 2, 20)])
+        # Re-saving a report replaces its findings rather than double counting them
+        self.storage.save_report(_make_report("r2", 2, 20))
+
+        recurring = self.storage.get_recurring_findings()
+        self.assertEqual(len(recurring), 1)
+        self.assertEqual(recurring[0]["count"], 2)
+        self.assertEqual(recurring[0]["avg_score"], 15.0)
+        self.assertTrue(recurring[0]["inLatest"])
+        self.assertEqual(len(self.storage.get_all_reports()), 2)
+
+    def test_accepted_risks_filter_findings(self):
+        self.storage.save_report(_make_report("r1", 1))
+        findings = self.storage.get_report("r1").findings
+
+        self.storage.add_accepted_risk("StaleObjects", "S-PwdNeverExpires")
+        self.assertEqual(self.storage.get_unaccepted_findings(findings), [])
+        self.assertEqual(self.storage.get_unaccepted_findings_for_report("r1"), [])
+
+        self.storage.remove_accepted_risk("StaleObjects", "S-PwdNeverExpires")
+        self.assertEqual(len(self.storage.get_unaccepted_findings(findings)), 1)
+        self.assertEqual(len(self.storage.get_unaccepted_findings_for_report("r1")), 1)
+
+    def test_settings_round_trip(self):
+        self.storage.update_settings("https://hooks.example/x", "alert")
+        settings = self.storage.get_settings()
+        self.assertEqual(settings.webhook_url, "https://hooks.example/x")
+        self.assertEqual(settings.alert_message, "alert")
+
+    def test_schema_version_recorded(self):
+        """Schema upgrades are skipped once user_version is current, including after a reset."""
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], _SCHEMA_VERSION)
+
+        self.storage.clear_all_data()
+        self.storage.save_report(_make_report("r1", 1))
+        self.storage.update_report_html("r1", "r1.html")
+        self.assertEqual(self.storage.get_report("r1").html_file, "r1.html")
+
+    def test_upgrades_legacy_schema(self):
+        """Databases created before tool_type was stored are upgraded in place."""
+        self.storage.close()
+        legacy_path = os.path.join(self.tmpdir.name, "legacy.db")
+        conn = sqlite3.connect(legacy_path)
+        conn.execute(
+            "CREATE TABLE reports (id TEXT PRIMARY KEY, domain TEXT, report_date TEXT, "
+            "upload_date TEXT, pingcastle_global_score INTEGER, high_score INTEGER, "
+            "medium_score INTEGER, low_score INTEGER)"
+        )
+        conn.execute(
+            "CREATE TABLE findings (id TEXT PRIMARY KEY, report_id TEXT, category TEXT, "
+            "name TEXT, score INTEGER, description TEXT)"
+        )
+        conn.execute(
+            "INSERT INTO reports (id, domain, report_date, upload_date, pingcastle_global_score) "
+            "VALUES ('old', 'test.local', '2023-01-01T00:00:00', '2023-01-01T00:00:00', 30)"
+        )
+        conn.execute("INSERT INTO findings VALUES ('old-f1', 'old', 'Trusts', 'T-x', 5, '')")
+        conn.commit()
+        conn.close()
+
+        self.storage = ReportStorage(legacy_path)
+        report = self.storage.get_report("old")
+        self.assertEqual(report.global_score, 30)
+        self.assertEqual(report.tool_type, SecurityToolType.PINGCASTLE)
+        self.assertEqual(self.storage.get_recurring_findings()[0]["count"], 1)
+        self.assertEqual([f.id for f in report.findings], ["old-f1"])
+
+        # Re-saving an upgraded report keeps its findings attached
+        report.findings.append(Finding(
+            id="old-f2", report_id="old", tool_type=SecurityToolType.PINGCASTLE,
+            category="Trusts", name="T-y", score=1,
+        ))
+        self.storage.save_report(report)
+        self.assertEqual(
+            sorted(f.id for f in self.storage.get_report("old").findings), ["old-f1", "old-f2"]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)